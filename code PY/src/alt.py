@@ -0,0 +1,224 @@
+import heapq
+import json
+import math
+import random
+import struct
+from array import array
+from typing import Callable, List, Optional, Sequence, Tuple
+from graph import Graph, NodeId
+
+# Identificação e versão do arquivo de landmarks
+MAGIC = b'GRLM'
+VERSION = 2
+
+# Extensão usada para as tabelas gravadas ao lado do arquivo de origem
+ALT_EXT = '.galt'
+
+# Cabeçalho: magic, versão, tipo dos ids, nº de nós, nº de landmarks, tamanho do bloco de ids
+# e SHA-256 dos pesos do grafo usado no cálculo
+_HEADER = struct.Struct('<4sIBxxxQQQ32s')
+
+# Quantidade padrão de landmarks e de landmarks ativos por consulta
+NUM_LANDMARKS = 8
+NUM_ACTIVE = 4
+
+class Landmarks:
+    """
+    Tabelas de distâncias para a heurística ALT (A*, Landmarks e desigualdade triangular).
+    Para cada landmark L guarda-se d(L, v) de todos os nós v em um vetor de floats,
+    na ordem de graph.nodes. Como as arestas são bidirecionais,
+    |d(L, t) - d(L, v)| é um limite inferior de d(v, t) para qualquer L.
+    """
+    def __init__(self, ids: Sequence[NodeId], landmarks: List[int], tables: List[Sequence[float]]):
+        self.ids = ids
+        self.index = {nid: i for i, nid in enumerate(ids)}
+        self.landmarks = landmarks  # Índices dos nós escolhidos como landmarks
+        self.tables = tables        # tables[k][i] = distância do landmark k ao nó i (inf se inalcançável)
+
+    @classmethod
+    def build(cls, graph: Graph, count: int = NUM_LANDMARKS, strategy: str = 'farthest',
+              seed: int = 0) -> 'Landmarks':
+        """
+        Escolhe os landmarks e calcula suas tabelas com um Dijkstra completo cada.
+        Estratégias:
+        - 'farthest': começa por um nó sorteado e escolhe, a cada passo, o nó alcançável
+          mais distante dos landmarks já escolhidos (o primeiro sorteado é substituído
+          pelo nó mais distante dele);
+        - 'planar': divide o plano em setores ao redor do centro do mapa e escolhe,
+          em cada setor, o nó mais distante do centro (cantos e bordas do mapa).
+        """
+        ids = list(graph.nodes)
+        if not ids:
+            return cls(ids, [], [])
+
+        if strategy == 'planar':
+            chosen = _planar_landmarks(graph, ids, count)
+            tables = [_distance_table(graph, ids, ids[i]) for i in chosen]
+            return cls(ids, chosen, tables)
+        if strategy != 'farthest':
+            raise ValueError(f"Estratégia de landmarks desconhecida: {strategy}")
+
+        rng = random.Random(seed)
+        seed_table = _distance_table(graph, ids, ids[rng.randrange(len(ids))])
+        chosen: List[int] = []
+        tables: List[array] = []
+
+        # Menor distância de cada nó até os landmarks escolhidos (começa pelo nó sorteado)
+        min_dist = list(seed_table)
+        while len(chosen) < min(count, len(ids)):
+            best = max(range(len(ids)), key=lambda i: min_dist[i] if min_dist[i] < math.inf else -1)
+            if best in chosen:
+                break
+            table = _distance_table(graph, ids, ids[best])
+            chosen.append(best)
+            tables.append(table)
+            if len(chosen) == 1:
+                min_dist = list(table)
+            else:
+                min_dist = [min(a, b) for a, b in zip(min_dist, table)]
+
+        return cls(ids, chosen, tables)
+
+    def potential(self, start_id: NodeId, end_id: NodeId,
+                  active: int = NUM_ACTIVE) -> Callable[[NodeId], Optional[float]]:
+        """
+        Retorna a função heurística de uma consulta até end_id.
+        Usa apenas os landmarks que dão o maior limite entre origem e destino (landmarks ativos)
+        e que alcançam o destino. Retorna None para nós que estão em outro componente,
+        pois eles não alcançam o destino.
+        """
+        index = self.index
+        s, t = index[start_id], index[end_id]
+
+        usable = [tbl for tbl in self.tables if tbl[t] < math.inf]
+        usable.sort(key=lambda tbl: abs(tbl[s] - tbl[t]) if tbl[s] < math.inf else 0, reverse=True)
+        cols = [(tbl, tbl[t]) for tbl in usable[:active]]
+        inf = math.inf
+
+        def h(nid: NodeId) -> Optional[float]:
+            i = index[nid]
+            best = 0.0
+            for tbl, dt in cols:
+                dv = tbl[i]
+                if dv == inf:
+                    return None
+                diff = dv - dt if dv > dt else dt - dv
+                if diff > best:
+                    best = diff
+            return best
+
+        return h
+
+    def repair(self, graph: Graph, decreased: List[Tuple[NodeId, NodeId, float]]):
+        """
+        Corrige as tabelas após a redução do peso das arestas (u, v, novo peso) em decreased,
+        propagando apenas as distâncias que diminuem. Aumentos de peso não exigem correção:
+        distâncias antigas menores continuam dando limites inferiores válidos.
+        """
+        index, ids = self.index, self.ids
+        for table in self.tables:
+            pq = []
+            for a, b, w in decreased:
+                ia, ib = index[a], index[b]
+                for x, y in ((ia, ib), (ib, ia)):
+                    if table[x] + w < table[y]:
+                        table[y] = table[x] + w
+                        heapq.heappush(pq, (table[y], y))
+            while pq:
+                d, x = heapq.heappop(pq)
+                if d > table[x]:
+                    continue
+                for node, w, _ in graph.nodes[ids[x]].edges:
+                    y = index[node.id]
+                    if d + w < table[y]:
+                        table[y] = d + w
+                        heapq.heappush(pq, (d + w, y))
+
+    def save(self, path: str, graph: Graph):
+        """
+        Grava os landmarks e suas tabelas em arquivo binário, junto com a assinatura dos pesos de graph.
+        """
+        if list(self.ids) == list(range(len(self.ids))):
+            ids_kind, ids_blob = 0, b''
+        else:
+            ids_kind, ids_blob = 1, json.dumps(list(self.ids)).encode('utf-8')
+
+        with open(path, 'wb') as f:
+            f.write(_HEADER.pack(MAGIC, VERSION, ids_kind, len(self.ids), len(self.landmarks), len(ids_blob),
+                                 graph.weights_digest()))
+            f.write(array('q', self.landmarks).tobytes())
+            for table in self.tables:
+                f.write(array('d', table).tobytes())
+            f.write(ids_blob)
+
+    @classmethod
+    def load(cls, path: str, graph: Graph) -> Optional['Landmarks']:
+        """
+        Lê as tabelas gravadas por save. Retorna None se o arquivo não existir,
+        for de outra versão ou não corresponder aos nós e pesos do grafo informado.
+        """
+        try:
+            with open(path, 'rb') as f:
+                data = f.read()
+        except OSError:
+            return None
+
+        if len(data) < _HEADER.size:
+            return None
+        magic, version, ids_kind, n, k, ids_len, digest = _HEADER.unpack_from(data, 0)
+        if magic != MAGIC or version != VERSION or n != len(graph.nodes) or digest != graph.weights_digest():
+            return None
+
+        pos = _HEADER.size
+        chosen = array('q')
+        chosen.frombytes(data[pos:pos + 8 * k])
+        pos += 8 * k
+        tables = []
+        for _ in range(k):
+            table = array('d')
+            table.frombytes(data[pos:pos + 8 * n])
+            tables.append(table)
+            pos += 8 * n
+        ids = range(n) if ids_kind == 0 else json.loads(data[pos:pos + ids_len].decode('utf-8'))
+
+        if list(ids) != list(graph.nodes):
+            return None
+        return cls(ids, list(chosen), tables)
+
+def load_or_build(graph: Graph, path: str, count: int = NUM_LANDMARKS, strategy: str = 'farthest') -> Landmarks:
+    """
+    Carrega as tabelas gravadas em path; se não existirem ou não corresponderem ao grafo,
+    calcula novas e tenta gravá-las para as próximas execuções.
+    """
+    landmarks = Landmarks.load(path, graph)
+    if landmarks is None:
+        landmarks = Landmarks.build(graph, count, strategy)
+        try:
+            landmarks.save(path, graph)
+        except OSError:
+            pass
+    return landmarks
+
+def _distance_table(graph: Graph, ids: List[NodeId], source_id: NodeId) -> array:
+    """
+    Distâncias de source_id a todos os nós (Dijkstra completo), na ordem de ids.
+    """
+    dist, _ = graph._dijkstra(source_id)
+    return array('d', (dist.get(nid, math.inf) for nid in ids))
+
+def _planar_landmarks(graph: Graph, ids: List[NodeId], count: int) -> List[int]:
+    """
+    Escolhe, em cada um de count setores angulares ao redor do centro do mapa,
+    o nó mais distante do centro.
+    """
+    xs = [graph.nodes[nid].x for nid in ids]
+    ys = [graph.nodes[nid].y for nid in ids]
+    cx, cy = (min(xs) + max(xs)) / 2, (min(ys) + max(ys)) / 2
+
+    best = {}
+    for i, (x, y) in enumerate(zip(xs, ys)):
+        sector = int((math.atan2(y - cy, x - cx) + math.pi) / (2 * math.pi) * count) % count
+        r = (x - cx) ** 2 + (y - cy) ** 2
+        if sector not in best or r > best[sector][0]:
+            best[sector] = (r, i)
+    return [i for _, i in (best[k] for k in sorted(best))]
@@ -0,0 +1,280 @@
+import argparse
+import json
+import math
+import os
+import platform
+import random
+import sys
+import time
+import tracemalloc
+from typing import Callable, Dict, List, Optional, Sequence
+from alt import Landmarks
+from ch import ContractionHierarchy
+from compact import CompactGraph
+from loader import load_geojson
+from simplify import SimplifiedGraph
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+# Diretório dos mapas de exemplo e mapas usados por padrão
+DATA_DIR = os.path.normpath(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'data'))
+DATASETS = ('mapa.geojson', 'teste.geojson', '2kmBH.geojson')
+
+# Arquivo de referência usado na comparação de desempenho
+BASELINE_PATH = os.path.join(DATA_DIR, 'benchmark_baseline.json')
+
+# Aumento relativo da mediana, em relação à referência, considerado regressão
+TOLERANCE = 0.5
+
+# Etapas com mediana de referência abaixo deste valor (em ms) não são comparadas, por serem dominadas por ruído
+MIN_COMPARE_MS = 1.0
+
+# Além do aumento relativo, a mediana precisa piorar pelo menos este valor (em ms) para contar como regressão
+MIN_REGRESSION_MS = 0.5
+
+# Repetições do carregamento de cada mapa (a mediana de poucas amostras oscila demais)
+LOAD_REPEATS = 10
+
+# Consultas usadas na medição de memória (feita à parte, pois tracemalloc deixa o código mais lento)
+MEMORY_QUERIES = 10
+
+# Métodos comparados na verificação das distâncias
+CHECK_METHODS = ('D', 'DP', 'DB', 'A', 'CH', 'ALT')
+
+def percentile(values: Sequence[float], p: float) -> float:
+    """
+    Percentil p (0 a 100) com interpolação linear; values deve estar ordenada.
+    """
+    if not values:
+        return 0.0
+    k = (len(values) - 1) * p / 100
+    lo = math.floor(k)
+    hi = min(lo + 1, len(values) - 1)
+    return values[lo] + (values[hi] - values[lo]) * (k - lo)
+
+def summarize(samples_ms: List[float]) -> Dict[str, float]:
+    """
+    Estatísticas de uma etapa: percentis, média e vazão (operações por segundo).
+    """
+    values = sorted(samples_ms)
+    total = sum(values)
+    return {
+        'count': len(values),
+        'total_ms': total,
+        'mean_ms': total / len(values) if values else 0.0,
+        'p50_ms': percentile(values, 50),
+        'p90_ms': percentile(values, 90),
+        'p99_ms': percentile(values, 99),
+        'max_ms': values[-1] if values else 0.0,
+        'ops_per_s': len(values) / (total / 1000) if total > 0 else 0.0,
+    }
+
+def _timed(fn: Callable, args_list: Sequence[tuple]) -> List[float]:
+    """
+    Executa fn para cada tupla de argumentos e retorna o tempo de cada chamada em ms.
+    """
+    samples = []
+    for args in args_list:
+        t0 = time.perf_counter()
+        fn(*args)
+        samples.append((time.perf_counter() - t0) * 1000)
+    return samples
+
+def _peak_kb(fn: Callable, args_list: Sequence[tuple]) -> float:
+    """
+    Pico de memória alocada (KiB, via tracemalloc) durante as chamadas de fn.
+    """
+    tracemalloc.start()
+    try:
+        for args in args_list:
+            fn(*args)
+        return tracemalloc.get_traced_memory()[1] / 1024
+    finally:
+        tracemalloc.stop()
+
+def _length(path) -> float:
+    return sum(w for _, _, w, _ in path)
+
+def bench_dataset(path: str, num_queries: int = 50, seed: int = 42, load_repeats: int = LOAD_REPEATS) -> dict:
+    """
+    Mede as etapas de roteamento sobre um mapa, com pares de nós sorteados com semente fixa:
+    carregamento, Dijkstra completo (_dijkstra), A* (_astar_prev), reconstrução do caminho
+    (_build_path), shortest_path de cada método e shortest_two_paths, também sobre o grafo simplificado.
+    Também confere se todos os métodos (incluindo CH, ALT, o grafo simplificado e o grafo compacto)
+    encontram caminhos de mesma distância.
+    """
+    stages: Dict[str, List[float]] = {}
+    memory: Dict[str, float] = {}
+
+    stages['load'] = _timed(lambda: load_geojson(path), [()] * load_repeats)
+    memory['load'] = _peak_kb(lambda: load_geojson(path), [()])
+    graph = load_geojson(path)
+
+    rng = random.Random(seed)
+    ids = list(graph.nodes)
+    pairs = [(rng.choice(ids), rng.choice(ids)) for _ in range(num_queries)]
+    mem_pairs = pairs[:MEMORY_QUERIES]
+
+    def prevs(pair_list):
+        return [(graph._astar_prev(s, t), t) for s, t in pair_list]
+
+    runs = {
+        'dijkstra': (lambda s, t: graph._dijkstra(s), pairs, mem_pairs),
+        'dijkstra_pp': (lambda s, t: graph._dijkstra(s, t), pairs, mem_pairs),
+        'astar': (graph._astar_prev, pairs, mem_pairs),
+        'reconstruction': (graph._build_path, prevs(pairs), prevs(mem_pairs)),
+    }
+    for method in ('D', 'DP', 'DB', 'A'):
+        runs[f'shortest_path_{method}'] = (lambda s, t, m=method: graph.shortest_path(s, t, m), pairs, mem_pairs)
+    runs['shortest_two_paths'] = (lambda s, t: graph.shortest_two_paths(s, t, 'A'), pairs, mem_pairs)
+
+    for name, (fn, args_list, mem_args) in runs.items():
+        stages[name] = _timed(fn, args_list)
+        memory[name] = _peak_kb(fn, mem_args)
+
+    t0 = time.perf_counter()
+    simplified = SimplifiedGraph.build(graph)
+    stages['simplify_build'] = [(time.perf_counter() - t0) * 1000]
+    graph.simplified = simplified
+    for name, fn in (('shortest_path_A_simplified', lambda s, t: graph.shortest_path(s, t, 'A')),
+                     ('shortest_two_paths_simplified', lambda s, t: graph.shortest_two_paths(s, t, 'A'))):
+        stages[name] = _timed(fn, pairs)
+        memory[name] = _peak_kb(fn, mem_pairs)
+    simplified_lengths = [_length(graph.shortest_path(s, t, 'A')) for s, t in pairs]
+    graph.simplified = None
+
+    # Pré-processamentos usados na verificação
+    t0 = time.perf_counter()
+    graph.hierarchy = ContractionHierarchy.build(graph)
+    stages['ch_build'] = [(time.perf_counter() - t0) * 1000]
+    t0 = time.perf_counter()
+    graph.landmarks = Landmarks.build(graph)
+    stages['alt_build'] = [(time.perf_counter() - t0) * 1000]
+
+    compact = CompactGraph.from_graph(graph)
+    mismatches = []
+    for (s, t), simplified_length in zip(pairs, simplified_lengths):
+        lengths = {m: _length(graph.shortest_path(s, t, m)) for m in CHECK_METHODS}
+        lengths['simplified'] = simplified_length
+        lengths['compact'] = _length(compact.shortest_path(s, t, 'A'))
+        ref = lengths['D']
+        if any(abs(d - ref) > 1e-6 * max(1.0, ref) for d in lengths.values()):
+            mismatches.append({'start': s, 'end': t, 'lengths': lengths})
+
+    return {
+        'path': os.path.basename(path),
+        'nodes': len(graph.nodes),
+        'edges': sum(len(n.edges) for n in graph.nodes.values()) // 2,
+        'queries': num_queries,
+        'seed': seed,
+        'simplified': simplified.reduction(),
+        'stages': {name: summarize(samples) for name, samples in stages.items()},
+        'peak_memory_kb': memory,
+        'mismatches': mismatches,
+    }
+
+def run(paths: Sequence[str], num_queries: int = 50, seed: int = 42) -> dict:
+    """
+    Executa bench_dataset em cada mapa e reúne os resultados com informações do ambiente.
+    """
+    results = {
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'datasets': {},
+    }
+    for path in paths:
+        results['datasets'][os.path.basename(path)] = bench_dataset(path, num_queries, seed)
+    if resource is not None:
+        # ru_maxrss é dado em KiB no Linux e em bytes no macOS
+        maxrss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        results['max_rss_kb'] = maxrss / 1024 if sys.platform == 'darwin' else maxrss
+    return results
+
+def compare(results: dict, baseline: dict, tolerance: float = TOLERANCE) -> List[str]:
+    """
+    Compara a mediana de cada etapa com a referência e retorna as regressões encontradas: aumento
+    relativo acima de tolerance e absoluto de pelo menos MIN_REGRESSION_MS.
+    Etapas ou mapas ausentes da referência e etapas mais rápidas que MIN_COMPARE_MS são ignorados.
+    """
+    regressions = []
+    for name, data in results['datasets'].items():
+        base = baseline.get('datasets', {}).get(name)
+        if not base:
+            continue
+        for stage, stats in data['stages'].items():
+            ref = base['stages'].get(stage, {}).get('p50_ms')
+            if (ref and ref >= MIN_COMPARE_MS and stats['p50_ms'] > ref * (1 + tolerance) and
+                    stats['p50_ms'] - ref >= MIN_REGRESSION_MS):
+                regressions.append(f"{name} {stage}: p50 {stats['p50_ms']:.3f} ms "
+                                   f"(referência {ref:.3f} ms, +{(stats['p50_ms'] / ref - 1) * 100:.0f}%)")
+    return regressions
+
+def report(results: dict):
+    """
+    Imprime uma tabela por mapa com as estatísticas de cada etapa.
+    """
+    for name, data in results['datasets'].items():
+        print(f"\n{name}: {data['nodes']} nós, {data['edges']} arestas, {data['queries']} consultas")
+        if 'simplified' in data:
+            r = data['simplified']
+            print(f"  simplificado: {r['core_nodes']} nós, {r['core_edges']} arestas")
+        print(f"  {'etapa':30s} {'p50 ms':>9s} {'p90 ms':>9s} {'p99 ms':>9s} {'op/s':>9s} {'pico KiB':>9s}")
+        for stage, s in data['stages'].items():
+            peak = data['peak_memory_kb'].get(stage)
+            peak_txt = f"{peak:9.0f}" if peak is not None else f"{'-':>9s}"
+            print(f"  {stage:30s} {s['p50_ms']:9.3f} {s['p90_ms']:9.3f} {s['p99_ms']:9.3f} "
+                  f"{s['ops_per_s']:9.1f} {peak_txt}")
+        if data['mismatches']:
+            print(f"  ATENÇÃO: {len(data['mismatches'])} consultas com distâncias diferentes entre os métodos")
+        else:
+            print(f"  Distâncias iguais em todos os métodos ({', '.join(CHECK_METHODS)}, simplificado, compacto)")
+    if 'max_rss_kb' in results:
+        print(f"\nMemória máxima do processo: {results['max_rss_kb'] / 1024:.1f} MiB")
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Benchmark de roteamento sobre os mapas GeoJSON")
+    parser.add_argument('mapas', nargs='*', help="arquivos GeoJSON (padrão: mapas de data/)")
+    parser.add_argument('-n', '--queries', type=int, default=50, help="consultas por mapa")
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('-o', '--output', help="grava os resultados em JSON")
+    parser.add_argument('--baseline', default=BASELINE_PATH, help="JSON de referência para comparação")
+    parser.add_argument('--save-baseline', action='store_true', help="grava os resultados como nova referência")
+    parser.add_argument('--tolerance', type=float, default=TOLERANCE,
+                        help="aumento relativo da mediana aceito antes de acusar regressão")
+    args = parser.parse_args(argv)
+
+    paths = args.mapas or [os.path.join(DATA_DIR, name) for name in DATASETS]
+    results = run(paths, args.queries, args.seed)
+    report(results)
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=2)
+    if args.save_baseline:
+        with open(args.baseline, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=2)
+        print(f"Referência gravada em {args.baseline}")
+        return 0
+
+    status = 1 if any(d['mismatches'] for d in results['datasets'].values()) else 0
+    try:
+        with open(args.baseline, 'r', encoding='utf-8') as f:
+            baseline = json.load(f)
+    except OSError:
+        print("Sem arquivo de referência para comparação.")
+        return status
+
+    regressions = compare(results, baseline, args.tolerance)
+    if regressions:
+        print("\nRegressões em relação à referência:")
+        for line in regressions:
+            print(f"  {line}")
+        return 1
+    print("\nSem regressões em relação à referência.")
+    return status
+
+if __name__ == '__main__':
+    sys.exit(main())
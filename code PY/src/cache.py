@@ -0,0 +1,168 @@
+import hashlib
+import json
+import mmap
+import os
+import struct
+import sys
+from array import array
+from typing import Callable, Optional
+from compact import CompactGraph
+from components import Components
+from loader import load_geojson
+
+# Identificação e versão do formato binário; mudar a versão invalida caches antigos
+MAGIC = b'GRFC'
+VERSION = 3
+
+# Extensão usada para o cache gravado ao lado do arquivo de origem
+CACHE_EXT = '.gcache'
+
+# Cabeçalho: magic, versão, ordem de bytes, tipo dos ids, só o maior componente, nº de nós, nº de posições
+# de aresta, nº de componentes conexos, tamanho dos blocos de nomes e ids, tamanho e mtime da origem,
+# tolerância de agrupamento e SHA-256 da origem
+_HEADER = struct.Struct('<4sIBBBxQQQQQQqd32s')
+
+# Tipos de id armazenados: sequenciais 0..n-1 ou lista JSON com os ids originais
+_IDS_RANGE = 0
+_IDS_JSON = 1
+
+def file_digest(path: str) -> bytes:
+    """
+    Calcula o SHA-256 de um arquivo lendo-o em blocos.
+    """
+    h = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            h.update(block)
+    return h.digest()
+
+def _pad(n: int) -> int:
+    """
+    Bytes de preenchimento para alinhar uma seção em 8 bytes.
+    """
+    return -n % 8
+
+def save_cache(graph: CompactGraph, cache_path: str, source_path: str, snap_tolerance_m: float = 0.0,
+               largest_only: bool = False):
+    """
+    Grava o grafo compacto em formato binário versionado.
+    Os vetores são gravados como estão na memória, alinhados em 8 bytes, para que
+    load_cache possa mapeá-los diretamente sem cópia (inclusive os rótulos dos componentes
+    conexos, que assim não são recalculados a cada carga). O arquivo é escrito em um
+    temporário e renomeado, para que leitores nunca vejam um cache incompleto.
+    """
+    st = os.stat(source_path)
+    names_blob = json.dumps(graph.names).encode('utf-8')
+    if isinstance(graph.ids, range):
+        ids_kind, ids_blob = _IDS_RANGE, b''
+    else:
+        ids_kind, ids_blob = _IDS_JSON, json.dumps(list(graph.ids)).encode('utf-8')
+
+    header = _HEADER.pack(MAGIC, VERSION, sys.byteorder == 'little', ids_kind, largest_only,
+                          graph.num_nodes, len(graph.targets), graph.components.count,
+                          len(names_blob), len(ids_blob),
+                          st.st_size, st.st_mtime_ns, snap_tolerance_m, file_digest(source_path))
+
+    sections = [
+        array('d', graph.xs), array('d', graph.ys), array('q', graph.offsets),
+        array('i', graph.targets), array('d', graph.weights), array('i', graph.name_idx),
+        array('i', graph.edge_ids), array('i', graph.components.labels), array('i', graph.components.sizes),
+    ]
+
+    tmp_path = f"{cache_path}.{os.getpid()}.tmp"
+    with open(tmp_path, 'wb') as f:
+        f.write(header)
+        f.write(b'\0' * _pad(len(header)))
+        for arr in sections:
+            data = arr.tobytes()
+            f.write(data)
+            f.write(b'\0' * _pad(len(data)))
+        f.write(names_blob)
+        f.write(ids_blob)
+    os.replace(tmp_path, cache_path)
+
+def load_cache(cache_path: str, source_path: Optional[str] = None, snap_tolerance_m: float = 0.0,
+               verify_hash: bool = True, largest_only: bool = False) -> Optional[CompactGraph]:
+    """
+    Mapeia um cache binário em memória (somente leitura) e retorna o grafo compacto.
+    Os vetores do grafo apontam diretamente para o mapeamento, então vários processos
+    que abrem o mesmo arquivo compartilham as mesmas páginas do sistema operacional.
+    Se source_path for informado, o cache é considerado inválido (retorna None) quando o
+    tamanho, o mtime ou o hash da origem mudaram. Também retorna None para arquivos de
+    outra versão, ordem de bytes, tolerância de agrupamento ou opção largest_only.
+    """
+    try:
+        with open(cache_path, 'rb') as f:
+            mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    except (OSError, ValueError):
+        return None
+
+    if len(mm) < _HEADER.size:
+        return None
+
+    (magic, version, little, ids_kind, largest, n, m, k, names_len, ids_len,
+     src_size, src_mtime, snap, digest) = _HEADER.unpack_from(mm, 0)
+
+    if (magic != MAGIC or version != VERSION or little != (sys.byteorder == 'little') or
+            snap != snap_tolerance_m or largest != largest_only):
+        return None
+
+    if source_path is not None:
+        try:
+            st = os.stat(source_path)
+        except OSError:
+            return None
+        if st.st_size != src_size or st.st_mtime_ns != src_mtime:
+            return None
+        if verify_hash and file_digest(source_path) != digest:
+            return None
+
+    view = memoryview(mm)
+    pos = _HEADER.size + _pad(_HEADER.size)
+
+    def section(fmt: str, count: int) -> memoryview:
+        nonlocal pos
+        size = count * struct.calcsize(fmt)
+        part = view[pos:pos + size].cast(fmt)
+        pos += size + _pad(size)
+        return part
+
+    xs, ys = section('d', n), section('d', n)
+    offsets = section('q', n + 1)
+    targets, weights, name_idx = section('i', m), section('d', m), section('i', m)
+    edge_ids = section('i', m)
+    labels, sizes = section('i', n), section('i', k)
+
+    names = json.loads(bytes(view[pos:pos + names_len]).decode('utf-8'))
+    pos += names_len
+    if ids_kind == _IDS_RANGE:
+        ids = range(n)
+    else:
+        ids = json.loads(bytes(view[pos:pos + ids_len]).decode('utf-8'))
+
+    # Ids sequenciais dispensam o índice dos rótulos, como no próprio grafo
+    index = None if ids_kind == _IDS_RANGE else {nid: i for i, nid in enumerate(ids)}
+    components = Components(index, labels, sizes)
+    return CompactGraph(ids, xs, ys, offsets, targets, weights, name_idx, names, edge_ids, components)
+
+def load_graph_cached(source_path: str, cache_path: Optional[str] = None, snap_tolerance_m: float = 0.0,
+                      progress: Optional[Callable[[float], None]] = None, largest_only: bool = False) -> CompactGraph:
+    """
+    Retorna o grafo compacto do GeoJSON, usando o cache binário quando ele é válido.
+    Caso contrário, carrega o GeoJSON com o loader e grava um novo cache
+    (se o diretório não permitir escrita, o grafo é retornado mesmo assim).
+    progress acompanha a leitura do GeoJSON quando o cache não pode ser usado.
+    Com largest_only, apenas o maior componente conexo é mantido (ver load_geojson).
+    """
+    cache_path = cache_path or source_path + CACHE_EXT
+    graph = load_cache(cache_path, source_path, snap_tolerance_m, largest_only=largest_only)
+    if graph is not None:
+        return graph
+
+    graph = CompactGraph.from_graph(load_geojson(source_path, snap_tolerance_m, progress=progress,
+                                                 largest_only=largest_only))
+    try:
+        save_cache(graph, cache_path, source_path, snap_tolerance_m, largest_only)
+    except OSError:
+        pass
+    return graph
@@ -0,0 +1,324 @@
+import heapq
+import json
+import math
+import struct
+from array import array
+from typing import Dict, List, Optional, Sequence, Tuple
+from graph import Graph, NodeId
+
+# Identificação e versão do arquivo de hierarquia
+MAGIC = b'GRCH'
+VERSION = 2
+
+# Cabeçalho: magic, versão, tipo dos ids, nº de nós, nº de arestas ascendentes, tamanho do bloco de ids
+# e SHA-256 dos pesos do grafo usado na construção
+_HEADER = struct.Struct('<4sIBxxxQQQ32s')
+
+# Extensão usada para a hierarquia gravada ao lado do arquivo de origem
+CH_EXT = '.gch'
+
+# Limite de nós fixados em cada busca de testemunha durante a contração
+WITNESS_LIMIT = 60
+
+class ContractionHierarchy:
+    """
+    Hierarquia de contração (Contraction Hierarchies) construída sobre um Graph.
+    Os nós são contraídos um a um, em ordem de importância; ao remover um nó, atalhos
+    (shortcuts) são criados entre seus vizinhos sempre que o caminho através dele era
+    o único menor caminho. Cada nó guarda apenas as arestas para nós de ordem maior
+    (grafo ascendente, em formato CSR), e as consultas são Dijkstras bidirecionais
+    que só sobem na hierarquia.
+    Cada aresta ascendente guarda o nó intermediário do atalho (-1 para arestas originais),
+    usado para desempacotar o caminho de volta nas arestas do grafo.
+    """
+    def __init__(self, graph: Graph, ids: Sequence[NodeId], rank: Sequence[int], up_offsets: Sequence[int],
+                 up_targets: Sequence[int], up_weights: Sequence[float], up_mid: Sequence[int]):
+        self.graph = graph
+        self.ids = ids
+        self.index = {nid: i for i, nid in enumerate(ids)}
+        self.rank = rank
+        self.up_offsets = up_offsets
+        self.up_targets = up_targets
+        self.up_weights = up_weights
+        self.up_mid = up_mid
+
+    @classmethod
+    def build(cls, graph: Graph, witness_limit: int = WITNESS_LIMIT) -> 'ContractionHierarchy':
+        """
+        Executa o pré-processamento: ordena os nós pela diferença de arestas (atalhos criados
+        menos arestas removidas, mais o número de vizinhos já contraídos), com atualização
+        preguiçosa da prioridade, e contrai cada nó criando os atalhos necessários.
+        """
+        ids = list(graph.nodes)
+        index = {nid: i for i, nid in enumerate(ids)}
+        n = len(ids)
+
+        # Adjacência de trabalho: vizinho -> (peso, nó intermediário); arestas paralelas ficam com o menor peso
+        adj: List[Dict[int, Tuple[float, int]]] = [{} for _ in range(n)]
+        for i, nid in enumerate(ids):
+            for dest, w, _ in graph.nodes[nid].edges:
+                j = index[dest.id]
+                if j != i and w < adj[i].get(j, (math.inf,))[0]:
+                    adj[i][j] = (w, -1)
+
+        contracted = [False] * n
+        deleted_neighbors = [0] * n
+
+        def shortcuts_for(v: int) -> List[Tuple[int, int, float]]:
+            """
+            Atalhos (u, x, peso) necessários ao contrair v, usando buscas de testemunha limitadas.
+            """
+            neighbors = list(adj[v].items())
+            needed = []
+            for a, (u, (w_a, _)) in enumerate(neighbors):
+                targets = {x: w_a + w_x for x, (w_x, _) in neighbors[a + 1:]}
+                if not targets:
+                    continue
+                dist = _witness_search(adj, u, v, max(targets.values()), witness_limit)
+                for x, via in targets.items():
+                    if dist.get(x, math.inf) > via:
+                        needed.append((u, x, via))
+            return needed
+
+        def priority(v: int) -> int:
+            return len(shortcuts_for(v)) - len(adj[v]) + deleted_neighbors[v]
+
+        pq = [(priority(v), v) for v in range(n)]
+        heapq.heapify(pq)
+
+        rank = array('i', [0] * n)
+        up: List[List[Tuple[int, float, int]]] = [[] for _ in range(n)]
+        order = 0
+
+        while pq:
+            _, v = heapq.heappop(pq)
+            if contracted[v]:
+                continue
+
+            # Atualização preguiçosa: se a prioridade piorou, devolve o nó à fila
+            p = priority(v)
+            if pq and p > pq[0][0]:
+                heapq.heappush(pq, (p, v))
+                continue
+
+            for u, x, via in shortcuts_for(v):
+                if via < adj[u].get(x, (math.inf,))[0]:
+                    adj[u][x] = (via, v)
+                    adj[x][u] = (via, v)
+
+            # Todas as arestas restantes de v levam a nós contraídos depois dele (ordem maior)
+            up[v] = [(u, w, mid) for u, (w, mid) in adj[v].items()]
+            for u in adj[v]:
+                del adj[u][v]
+                deleted_neighbors[u] += 1
+            adj[v] = {}
+
+            contracted[v] = True
+            rank[v] = order
+            order += 1
+
+        up_offsets = array('q', [0])
+        up_targets, up_weights, up_mid = array('i'), array('d'), array('i')
+        for v in range(n):
+            for u, w, mid in up[v]:
+                up_targets.append(u)
+                up_weights.append(w)
+                up_mid.append(mid)
+            up_offsets.append(len(up_targets))
+
+        return cls(graph, ids, rank, up_offsets, up_targets, up_weights, up_mid)
+
+    def _upward_step(self, u: int, d: float, dist: Dict[int, float], prev: Dict[int, int], pq: list,
+                     _push=heapq.heappush):
+        """
+        Relaxa as arestas ascendentes de u em uma das direções da consulta.
+        """
+        for e in range(self.up_offsets[u], self.up_offsets[u + 1]):
+            v, nd = self.up_targets[e], d + self.up_weights[e]
+            if nd < dist.get(v, math.inf):
+                dist[v] = nd
+                prev[v] = u
+                _push(pq, (nd, v))
+
+    def query(self, start_id: NodeId, end_id: NodeId, _push=heapq.heappush, _pop=heapq.heappop) -> List[NodeId]:
+        """
+        Consulta bidirecional ascendente. Cada direção continua enquanto o menor valor da sua
+        fila for menor que a melhor distância encontrada; o encontro ocorre no nó de maior
+        ordem do caminho. Retorna a sequência de ids do menor caminho, com os atalhos
+        desempacotados, ou lista vazia se não houver caminho.
+        _push e _pop são trocados apenas pela instrumentação (ver stats.Probe).
+        """
+        s, t = self.index[start_id], self.index[end_id]
+        if s == t:
+            return [start_id]
+
+        dist = ({s: 0}, {t: 0})
+        prev: Tuple[Dict[int, int], Dict[int, int]] = ({}, {})
+        pq = ([(0, s)], [(0, t)])
+        best, meet = math.inf, -1
+
+        while pq[0] or pq[1]:
+            for side in (0, 1):
+                if not pq[side]:
+                    continue
+                d, u = _pop(pq[side])
+                if d > dist[side][u]:
+                    continue
+                if d >= best:
+                    # Nenhum nó restante nesta direção pode melhorar o resultado
+                    pq[side].clear()
+                    continue
+                if u in dist[side ^ 1] and d + dist[side ^ 1][u] < best:
+                    best, meet = d + dist[side ^ 1][u], u
+                self._upward_step(u, d, dist[side], prev[side], pq[side], _push)
+
+        if meet < 0:
+            return []
+
+        # Caminho no grafo ascendente: origem -> encontro -> destino
+        up_path = [meet]
+        while up_path[-1] in prev[0]:
+            up_path.append(prev[0][up_path[-1]])
+        up_path.reverse()
+        while up_path[-1] in prev[1]:
+            up_path.append(prev[1][up_path[-1]])
+
+        nodes = [up_path[0]]
+        for a, b in zip(up_path, up_path[1:]):
+            self._unpack(a, b, nodes)
+        return [self.ids[i] for i in nodes]
+
+    def _up_edge(self, a: int, b: int) -> Tuple[float, int]:
+        """
+        Retorna (peso, nó intermediário) da aresta ascendente entre a e b,
+        armazenada no nó de menor ordem.
+        """
+        low, high = (a, b) if self.rank[a] < self.rank[b] else (b, a)
+        best = (math.inf, -1)
+        for e in range(self.up_offsets[low], self.up_offsets[low + 1]):
+            if self.up_targets[e] == high and self.up_weights[e] < best[0]:
+                best = (self.up_weights[e], self.up_mid[e])
+        return best
+
+    def _unpack(self, a: int, b: int, out: List[int]):
+        """
+        Desempacota a aresta a -> b (recursivamente, se for atalho), acrescentando os nós em out.
+        """
+        stack = [(a, b)]
+        while stack:
+            u, v = stack.pop()
+            mid = self._up_edge(u, v)[1]
+            if mid < 0:
+                out.append(v)
+            else:
+                # Processa u -> mid antes de mid -> v
+                stack.append((mid, v))
+                stack.append((u, mid))
+
+    def prev_for(self, start_id: NodeId, end_id: NodeId,
+                 _push=heapq.heappush, _pop=heapq.heappop) -> Dict[NodeId, NodeId]:
+        """
+        Dicionário de predecessores do caminho encontrado, no mesmo formato das buscas de Graph.
+        """
+        nodes = self.query(start_id, end_id, _push, _pop)
+        return {nodes[i + 1]: nodes[i] for i in range(len(nodes) - 1)}
+
+    def shortest_path(self, start_id: NodeId, end_id: NodeId):
+        """
+        Mesmo resultado de Graph.shortest_path: segmentos (nó origem, nó destino, peso, nome da rua)
+        das arestas originais do grafo.
+        """
+        return self.graph._build_path(self.prev_for(start_id, end_id), end_id)
+
+    def save(self, path: str):
+        """
+        Grava a hierarquia em arquivo binário para ser reaproveitada nas próximas execuções.
+        """
+        if isinstance(self.ids, range) or list(self.ids) == list(range(len(self.ids))):
+            ids_kind, ids_blob = 0, b''
+        else:
+            ids_kind, ids_blob = 1, json.dumps(list(self.ids)).encode('utf-8')
+
+        with open(path, 'wb') as f:
+            f.write(_HEADER.pack(MAGIC, VERSION, ids_kind, len(self.ids), len(self.up_targets), len(ids_blob),
+                                 self.graph.weights_digest()))
+            for arr in (array('i', self.rank), array('q', self.up_offsets), array('i', self.up_targets),
+                        array('d', self.up_weights), array('i', self.up_mid)):
+                f.write(arr.tobytes())
+            f.write(ids_blob)
+
+    @classmethod
+    def load(cls, path: str, graph: Graph) -> Optional['ContractionHierarchy']:
+        """
+        Lê uma hierarquia gravada por save. Retorna None se o arquivo não existir, for de outra
+        versão ou não corresponder aos nós e pesos do grafo informado.
+        """
+        try:
+            with open(path, 'rb') as f:
+                data = f.read()
+        except OSError:
+            return None
+
+        if len(data) < _HEADER.size:
+            return None
+        magic, version, ids_kind, n, m, ids_len, digest = _HEADER.unpack_from(data, 0)
+        if magic != MAGIC or version != VERSION or n != len(graph.nodes) or digest != graph.weights_digest():
+            return None
+
+        pos = _HEADER.size
+
+        def section(fmt: str, count: int) -> array:
+            nonlocal pos
+            arr = array(fmt)
+            size = count * arr.itemsize
+            arr.frombytes(data[pos:pos + size])
+            pos += size
+            return arr
+
+        rank = section('i', n)
+        up_offsets = section('q', n + 1)
+        up_targets, up_weights, up_mid = section('i', m), section('d', m), section('i', m)
+        ids = range(n) if ids_kind == 0 else json.loads(data[pos:pos + ids_len].decode('utf-8'))
+
+        if list(ids) != list(graph.nodes):
+            return None
+        return cls(graph, ids, rank, up_offsets, up_targets, up_weights, up_mid)
+
+def load_or_build(graph: Graph, path: str) -> ContractionHierarchy:
+    """
+    Carrega a hierarquia gravada em path; se não existir ou não corresponder ao grafo,
+    constrói uma nova e tenta gravá-la para as próximas execuções.
+    """
+    hierarchy = ContractionHierarchy.load(path, graph)
+    if hierarchy is None:
+        hierarchy = ContractionHierarchy.build(graph)
+        try:
+            hierarchy.save(path)
+        except OSError:
+            pass
+    return hierarchy
+
+def _witness_search(adj: List[Dict[int, Tuple[float, int]]], source: int, skip: int,
+                    max_dist: float, limit: int) -> Dict[int, float]:
+    """
+    Dijkstra local a partir de source que ignora o nó skip, limitado pela distância
+    max_dist e por um número máximo de nós fixados. Distâncias não encontradas são
+    tratadas como infinitas (o atalho é criado por segurança).
+    """
+    dist = {source: 0}
+    pq = [(0, source)]
+    settled = 0
+    while pq and settled < limit:
+        d, u = heapq.heappop(pq)
+        if d > dist[u]:
+            continue
+        if d > max_dist:
+            break
+        settled += 1
+        for v, (w, _) in adj[u].items():
+            if v == skip:
+                continue
+            if d + w < dist.get(v, math.inf):
+                dist[v] = d + w
+                heapq.heappush(pq, (d + w, v))
+    return dist
@@ -0,0 +1,472 @@
+import heapq
+import math
+import time
+from array import array
+from typing import Dict, List, Optional, Sequence, Set, Tuple
+from components import Components
+from graph import Graph, Node, haversine_distance
+from stats import Probe, SearchStats
+
+class _RangeIndex:
+    """
+    Índice trivial para ids sequenciais 0..n-1 (id e índice coincidem), sem dicionário.
+    """
+    __slots__ = ('n',)
+
+    def __init__(self, n: int):
+        self.n = n
+
+    def __getitem__(self, nid) -> int:
+        if isinstance(nid, int) and 0 <= nid < self.n:
+            return nid
+        raise KeyError(nid)
+
+    def __contains__(self, nid) -> bool:
+        return isinstance(nid, int) and 0 <= nid < self.n
+
+    def __len__(self) -> int:
+        return self.n
+
+class CompactGraph:
+    """
+    Representação compacta e imutável de um Graph no formato CSR (compressed sparse row).
+    Os nós são identificados por índices inteiros; as arestas do nó i ocupam as posições
+    offsets[i]..offsets[i+1]-1 dos vetores targets, weights e name_idx.
+    Os nomes de rua são armazenados uma única vez na tabela names.
+    edge_ids guarda, para cada posição, o id estável da aresta (o mesmo de Graph.add_edge),
+    compartilhado pelas duas posições de uma aresta; sem ele, os ids são atribuídos em ordem.
+    Os componentes conexos (recebidos prontos, como do cache binário, ou calculados no primeiro
+    uso) recusam em O(1) pares sem caminho.
+    """
+    __slots__ = ('ids', 'index', 'xs', 'ys', 'offsets', 'targets', 'weights', 'name_idx', 'names', 'edge_ids',
+                 '_components')
+
+    def __init__(self, ids: Sequence, xs: Sequence[float], ys: Sequence[float], offsets: Sequence[int],
+                 targets: Sequence[int], weights: Sequence[float], name_idx: Sequence[int], names: List[str],
+                 edge_ids: Optional[Sequence[int]] = None, components: Optional[Components] = None):
+        self.ids = ids
+        if isinstance(ids, range) and ids.start == 0 and ids.step == 1:
+            self.index = _RangeIndex(len(ids))
+        else:
+            self.index = {nid: i for i, nid in enumerate(ids)}
+        self.xs = xs  # Longitudes
+        self.ys = ys  # Latitudes
+        self.offsets = offsets
+        self.targets = targets
+        self.weights = weights
+        self.name_idx = name_idx
+        self.names = names
+        if edge_ids is None:
+            edge_ids = array('i', [-1]) * len(targets)
+            self._assign_edge_ids(edge_ids, 0)
+        self.edge_ids = edge_ids
+        self._components = components
+
+    @property
+    def components(self) -> Components:
+        """
+        Componentes conexos; sem rótulos prontos, são calculados (union-find sobre o CSR) no primeiro acesso.
+        """
+        if self._components is None:
+            self._components = Components.from_csr(self.offsets, self.targets,
+                                                   None if isinstance(self.index, _RangeIndex) else self.index)
+        return self._components
+
+    def _assign_edge_ids(self, edge_ids: array, next_id: int):
+        """
+        Atribui ids novos, em ordem, às arestas sem id (-1), casando cada posição com a
+        posição do sentido oposto (mesmo par de nós e mesmo peso).
+        """
+        pending: Dict[Tuple[int, int, float], List[int]] = {}
+        for u in range(len(self.offsets) - 1):
+            for e in range(self.offsets[u], self.offsets[u + 1]):
+                if edge_ids[e] >= 0:
+                    continue
+                v, w = self.targets[e], self.weights[e]
+                waiting = pending.get((v, u, w))
+                if waiting:
+                    edge_ids[e] = edge_ids[waiting.pop()]
+                else:
+                    edge_ids[e] = next_id
+                    next_id += 1
+                    pending.setdefault((u, v, w), []).append(e)
+
+    @classmethod
+    def from_graph(cls, graph: Graph) -> 'CompactGraph':
+        """
+        Constrói a representação compacta a partir de um Graph já carregado.
+        A ordem das arestas de cada nó é preservada.
+        """
+        ids = list(graph.nodes)
+        index = {nid: i for i, nid in enumerate(ids)}
+        xs, ys = array('d'), array('d')
+        offsets = array('q', [0])
+        targets, weights, name_idx = array('i'), array('d'), array('i')
+
+        # Tabela de nomes: cada nome de rua distinto é guardado uma única vez
+        names: List[str] = []
+        name_ids: Dict[str, int] = {}
+
+        for nid in ids:
+            node = graph.nodes[nid]
+            xs.append(node.x)
+            ys.append(node.y)
+            for dest, w, name in node.edges:
+                if name not in name_ids:
+                    name_ids[name] = len(names)
+                    names.append(name)
+                targets.append(index[dest.id])
+                weights.append(w)
+                name_idx.append(name_ids[name])
+            offsets.append(len(targets))
+
+        # Ids das arestas registradas em graph; posições sem registro recebem ids novos
+        edge_ids = array('i', [-1]) * len(targets)
+        for edge_id, (src, i, dst, j) in enumerate(graph.edge_refs):
+            edge_ids[offsets[index[src.id]] + i] = edge_id
+            edge_ids[offsets[index[dst.id]] + j] = edge_id
+
+        # Ids sequenciais (gerados pelo loader) dispensam o dicionário de índices
+        if ids == list(range(len(ids))):
+            ids = range(len(ids))
+
+        # Os rótulos calculados pelo loader valem para os mesmos nós na mesma ordem
+        compact = cls(ids, xs, ys, offsets, targets, weights, name_idx, names, edge_ids, graph.components)
+        compact._assign_edge_ids(edge_ids, len(graph.edge_refs))
+        return compact
+
+    def to_graph(self) -> Graph:
+        """
+        Reconstrói um Graph mutável com os mesmos nós e arestas (na mesma ordem) e os mesmos ids
+        de aresta. O peso original de cada aresta passa a ser o peso atual.
+        """
+        graph = Graph()
+        for i, nid in enumerate(self.ids):
+            graph.add_node(nid, self.xs[i], self.ys[i])
+        nodes = [graph.nodes[nid] for nid in self.ids]
+        ends: List[List[Tuple[Node, int]]] = [[] for _ in range(max(self.edge_ids, default=-1) + 1)]
+        for u, node in enumerate(nodes):
+            for e in range(self.offsets[u], self.offsets[u + 1]):
+                node.add_edge(nodes[self.targets[e]], self.weights[e], self.names[self.name_idx[e]])
+                ends[self.edge_ids[e]].append((node, e - self.offsets[u]))
+        for (src, i), (dst, j) in ends:
+            graph._register_edge(src, i, dst, j)
+        # Mesmos nós na mesma ordem: os rótulos dos componentes valem para o novo grafo
+        graph.components = self.components
+        return graph
+
+    @property
+    def num_nodes(self) -> int:
+        return len(self.ids)
+
+    @property
+    def num_edges(self) -> int:
+        """
+        Número de arestas não direcionadas (cada uma é armazenada nos dois sentidos).
+        """
+        return len(self.targets) // 2
+
+    def _edge_slot(self, u: int, v: int, excluded: Set[int] = frozenset()) -> int:
+        """
+        Retorna a posição da aresta u -> v de menor peso (ignorando as excluídas), ou -1.
+        """
+        best, best_w = -1, math.inf
+        for e in range(self.offsets[u], self.offsets[u + 1]):
+            if self.targets[e] == v and self.weights[e] < best_w and e not in excluded:
+                best, best_w = e, self.weights[e]
+        return best
+
+    def _dijkstra_idx(self, s: int, t: int = -1, excluded: Set[int] = frozenset(),
+                      _push=heapq.heappush, _pop=heapq.heappop) -> Tuple[Dict[int, float], Dict[int, int]]:
+        """
+        Dijkstra sobre índices. Se t >= 0, para assim que o destino é fixado.
+        As posições de aresta em excluded são ignoradas durante a busca.
+        """
+        offsets, targets, weights = self.offsets, self.targets, self.weights
+        dist: Dict[int, float] = {s: 0}
+        prev: Dict[int, int] = {}
+        pq = [(0, s)]
+
+        while pq:
+            d, u = _pop(pq)
+            if d > dist[u]:
+                continue
+            if u == t:
+                break
+            for e in range(offsets[u], offsets[u + 1]):
+                if excluded and e in excluded:
+                    continue
+                v, nd = targets[e], d + weights[e]
+                if nd < dist.get(v, math.inf):
+                    dist[v] = nd
+                    prev[v] = u
+                    _push(pq, (nd, v))
+
+        return dist, prev
+
+    def _distances_idx(self, s: int, targets: Set[int]) -> Dict[int, float]:
+        """
+        Dijkstra sobre índices sem predecessores, interrompido assim que todos os nós
+        de targets foram fixados. Retorna as distâncias dos nós alcançados.
+        """
+        offsets, targets_arr, weights = self.offsets, self.targets, self.weights
+        dist: Dict[int, float] = {s: 0}
+        remaining = set(targets)
+        pq = [(0, s)]
+
+        while pq and remaining:
+            d, u = heapq.heappop(pq)
+            if d > dist[u]:
+                continue
+            remaining.discard(u)
+            for e in range(offsets[u], offsets[u + 1]):
+                v, nd = targets_arr[e], d + weights[e]
+                if nd < dist.get(v, math.inf):
+                    dist[v] = nd
+                    heapq.heappush(pq, (nd, v))
+
+        return dist
+
+    def _bidirectional_idx(self, s: int, t: int, excluded: Set[int] = frozenset(),
+                           _push=heapq.heappush, _pop=heapq.heappop) -> Dict[int, int]:
+        """
+        Dijkstra bidirecional sobre índices. Retorna os predecessores apenas do caminho encontrado.
+        Como toda aresta existe nos dois sentidos, a busca reversa usa as mesmas listas.
+        """
+        if s == t:
+            return {}
+
+        offsets, targets, weights = self.offsets, self.targets, self.weights
+        dist = ({s: 0}, {t: 0})
+        prev: Tuple[Dict[int, int], Dict[int, int]] = ({}, {})
+        pq = ([(0, s)], [(0, t)])
+        settled = (set(), set())
+
+        best, meet = math.inf, -1
+        side = 0
+
+        while pq[0] and pq[1]:
+            if pq[0][0][0] + pq[1][0][0] >= best:
+                break
+
+            d, u = _pop(pq[side])
+            if u in settled[side]:
+                side ^= 1
+                continue
+            settled[side].add(u)
+
+            own_dist, other_dist = dist[side], dist[side ^ 1]
+            for e in range(offsets[u], offsets[u + 1]):
+                if excluded and e in excluded:
+                    continue
+                v, nd = targets[e], d + weights[e]
+                if nd < own_dist.get(v, math.inf):
+                    own_dist[v] = nd
+                    prev[side][v] = u
+                    _push(pq[side], (nd, v))
+                if v in other_dist and nd + other_dist[v] < best:
+                    best, meet = nd + other_dist[v], v
+
+            side ^= 1
+
+        if meet < 0:
+            return {}
+
+        nodes_path = [meet]
+        while nodes_path[-1] in prev[0]:
+            nodes_path.append(prev[0][nodes_path[-1]])
+        nodes_path.reverse()
+        while nodes_path[-1] in prev[1]:
+            nodes_path.append(prev[1][nodes_path[-1]])
+
+        return {nodes_path[i + 1]: nodes_path[i] for i in range(len(nodes_path) - 1)}
+
+    def _astar_idx(self, s: int, t: int, excluded: Set[int] = frozenset(),
+                   _push=heapq.heappush, _pop=heapq.heappop, _h=haversine_distance) -> Dict[int, int]:
+        """
+        A* com fila de prioridade sobre índices, guiado pela distância de Haversine até o destino.
+        """
+        offsets, targets, weights = self.offsets, self.targets, self.weights
+        xs, ys = self.xs, self.ys
+        tx, ty = xs[t], ys[t]
+        came_from: Dict[int, int] = {}
+        g_score: Dict[int, float] = {s: 0}
+        closed = set()
+        pq = [(_h(ys[s], xs[s], ty, tx), 0, s)]
+
+        while pq:
+            _, g, u = _pop(pq)
+            if u in closed:
+                continue
+            if u == t:
+                return came_from
+            closed.add(u)
+            for e in range(offsets[u], offsets[u + 1]):
+                if excluded and e in excluded:
+                    continue
+                v, ng = targets[e], g + weights[e]
+                if ng < g_score.get(v, math.inf):
+                    came_from[v] = u
+                    g_score[v] = ng
+                    _push(pq, (ng + _h(ys[v], xs[v], ty, tx), ng, v))
+
+        return came_from
+
+    def _dijkstra(self, start_id, end_id=None) -> Tuple[Dict, Dict]:
+        """
+        Mesma interface de Graph._dijkstra: distâncias e predecessores indexados pelos ids originais.
+        """
+        ids = self.ids
+        t = self.index[end_id] if end_id is not None else -1
+        dist, prev = self._dijkstra_idx(self.index[start_id], t)
+        return {ids[i]: d for i, d in dist.items()}, {ids[v]: ids[u] for v, u in prev.items()}
+
+    def _astar_prev(self, start_id, end_id) -> Dict:
+        """
+        Mesma interface de Graph._astar_prev: predecessores indexados pelos ids originais.
+        """
+        ids = self.ids
+        prev = self._astar_idx(self.index[start_id], self.index[end_id])
+        return {ids[v]: ids[u] for v, u in prev.items()}
+
+    def _search_idx(self, s: int, t: int, method: str, excluded: Set[int] = frozenset()) -> Dict[int, int]:
+        """
+        Executa o método escolhido ('D', 'DP', 'DB' ou A*) e retorna os predecessores por índice.
+        Nós em componentes diferentes retornam {} sem busca.
+        """
+        labels = self.components.labels
+        if labels[s] != labels[t]:
+            return {}
+        method = method.upper()
+        if method == 'D':
+            return self._dijkstra_idx(s, excluded=excluded)[1]
+        if method == 'DP':
+            return self._dijkstra_idx(s, t, excluded)[1]
+        if method == 'DB':
+            return self._bidirectional_idx(s, t, excluded)
+        return self._astar_idx(s, t, excluded)
+
+    def _probed_idx(self, s: int, t: int, method: str, excluded: Set[int], stats: SearchStats) -> Dict[int, int]:
+        """
+        Mesmo despacho de _search_idx, com os ganchos de contagem da instrumentação (ver stats.Probe).
+        """
+        labels = self.components.labels
+        if labels[s] != labels[t]:
+            return {}
+        method = method.upper()
+        offsets = self.offsets
+        degree = lambda u: offsets[u + 1] - offsets[u]
+        t0 = time.perf_counter()
+        if method in ('D', 'DP'):
+            probe = Probe(degree, t if method == 'DP' else None)
+            prev = self._dijkstra_idx(s, t if method == 'DP' else -1, excluded, probe.push, probe.pop)[1]
+        elif method == 'DB':
+            probe = Probe(degree)
+            prev = self._bidirectional_idx(s, t, excluded, probe.push, probe.pop)
+        else:
+            probe = Probe(degree, t)
+            prev = self._astar_idx(s, t, excluded, probe.push, probe.pop, probe.timed(haversine_distance))
+        stats.record(probe, time.perf_counter() - t0, 0.0)
+        return prev
+
+    def _profiled_slots(self, s: int, t: int, method: str, excluded: Set[int],
+                        stats: SearchStats) -> List[Tuple[int, int]]:
+        """
+        Busca instrumentada seguida da reconstrução do caminho, cujo tempo também é somado em stats.
+        """
+        prev = self._probed_idx(s, t, method, excluded, stats)
+        t0 = time.perf_counter()
+        slots = self._path_slots(prev, t, excluded)
+        stats.reconstruction_ms += (time.perf_counter() - t0) * 1000
+        return slots
+
+    def _path_slots(self, prev: Dict[int, int], t: int, excluded: Set[int] = frozenset()) -> List[Tuple[int, int]]:
+        """
+        Reconstrói o caminho como lista de pares (nó de origem, posição da aresta), do início ao fim.
+        """
+        slots = []
+        v = t
+        while v in prev:
+            u = prev[v]
+            slots.append((u, self._edge_slot(u, v, excluded)))
+            v = u
+        slots.reverse()
+        return slots
+
+    def _segments(self, slots: List[Tuple[int, int]]) -> List[Tuple[Node, Node, float, str]]:
+        """
+        Converte as arestas do caminho em segmentos (nó origem, nó destino, peso, nome da rua).
+        Os objetos Node são criados sob demanda e não possuem lista de arestas.
+        """
+        nodes: Dict[int, Node] = {}
+
+        def node(i: int) -> Node:
+            if i not in nodes:
+                nodes[i] = Node(self.ids[i], self.xs[i], self.ys[i])
+            return nodes[i]
+
+        return [(node(u), node(self.targets[e]), self.weights[e], self.names[self.name_idx[e]]) for u, e in slots]
+
+    def _reverse_slot(self, u: int, e: int) -> int:
+        """
+        Posição da aresta u -> v no sentido oposto (mesmo par de nós e mesmo peso), ou -1.
+        """
+        v, w = self.targets[e], self.weights[e]
+        for r in range(self.offsets[v], self.offsets[v + 1]):
+            if self.targets[r] == u and self.weights[r] == w:
+                return r
+        return -1
+
+    def shortest_path(self, start_id, end_id, method: str) -> List[Tuple[Node, Node, float, str]]:
+        """
+        Mesma interface de Graph.shortest_path, executada sobre os vetores compactos.
+        """
+        s, t = self.index[start_id], self.index[end_id]
+        prev = self._search_idx(s, t, method)
+        return self._segments(self._path_slots(prev, t))
+
+    def shortest_two_paths(self, start_id, end_id, method: str) -> Tuple[List, List]:
+        """
+        Mesma interface de Graph.shortest_two_paths. Como a estrutura é imutável, as arestas
+        do primeiro caminho (nos dois sentidos) são apenas ignoradas na segunda busca.
+        """
+        s, t = self.index[start_id], self.index[end_id]
+        slots1 = self._path_slots(self._search_idx(s, t, method), t)
+        if not slots1:
+            return [], []
+
+        excluded = self._slots_edges(slots1)
+        slots2 = self._path_slots(self._search_idx(s, t, method, excluded), t, excluded)
+
+        return self._segments(slots1), self._segments(slots2)
+
+    def _slots_edges(self, slots: List[Tuple[int, int]]) -> Set[int]:
+        """
+        Posições das arestas de um caminho nos dois sentidos, para exclusão na segunda busca.
+        """
+        excluded = {e for _, e in slots}
+        excluded.update(r for r in (self._reverse_slot(u, e) for u, e in slots) if r >= 0)
+        return excluded
+
+    def shortest_path_with_stats(self, start_id, end_id, method: str) -> Tuple[List, SearchStats]:
+        """
+        Mesma interface de Graph.shortest_path_with_stats.
+        """
+        stats = SearchStats()
+        stats.queries = 1
+        t = self.index[end_id]
+        slots = self._profiled_slots(self.index[start_id], t, method, frozenset(), stats)
+        return self._segments(slots), stats
+
+    def shortest_two_paths_with_stats(self, start_id, end_id, method: str) -> Tuple[List, List, SearchStats]:
+        """
+        Mesma interface de Graph.shortest_two_paths_with_stats.
+        """
+        stats = SearchStats()
+        stats.queries = 1
+        s, t = self.index[start_id], self.index[end_id]
+        slots1 = self._profiled_slots(s, t, method, frozenset(), stats)
+        if not slots1:
+            return [], [], stats
+        slots2 = self._profiled_slots(s, t, method, self._slots_edges(slots1), stats)
+        return self._segments(slots1), self._segments(slots2), stats
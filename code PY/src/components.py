@@ -0,0 +1,112 @@
+from array import array
+from typing import Iterable, Mapping, Optional, Tuple
+from graph import Graph, NodeId
+
+class Components:
+    """
+    Componentes conexos de um grafo, calculados uma única vez com union-find sobre as arestas.
+    Cada nó recebe um rótulo em um vetor compacto (array de inteiros, na ordem dos nós), com
+    os componentes numerados do maior para o menor (o rótulo 0 é o maior componente).
+    Dois nós com rótulos diferentes não têm caminho entre si, o que é respondido em O(1) sem busca.
+    Alterações de peso (inclusive interdições) não mudam os rótulos: nós de um mesmo componente
+    podem ficar sem caminho, e nesse caso a busca é feita normalmente e não encontra rota.
+    """
+    __slots__ = ('index', 'labels', 'sizes')
+
+    def __init__(self, index: Optional[Mapping[NodeId, int]], labels: array, sizes: array):
+        self.index = index  # id do nó -> posição em labels; None para ids sequenciais 0..n-1
+        self.labels = labels
+        self.sizes = sizes  # Número de nós de cada componente, pelo rótulo
+
+    @classmethod
+    def build(cls, n: int, pairs: Iterable[Tuple[int, int]],
+              index: Optional[Mapping[NodeId, int]] = None) -> 'Components':
+        """
+        Rotula n nós (por posição) a partir dos pares de posições ligados por arestas.
+        Usa união por tamanho e compressão de caminho por divisão pela metade.
+        """
+        parent = array('i', range(n))
+        size = array('i', [1]) * n
+
+        def find(x: int) -> int:
+            while parent[x] != x:
+                parent[x] = parent[parent[x]]
+                x = parent[x]
+            return x
+
+        for u, v in pairs:
+            ru, rv = find(u), find(v)
+            if ru != rv:
+                if size[ru] < size[rv]:
+                    ru, rv = rv, ru
+                parent[rv] = ru
+                size[ru] += size[rv]
+
+        roots = array('i', (find(x) for x in range(n)))
+        # Rótulos compactos: componentes em ordem decrescente de tamanho (empates pela primeira posição)
+        order = sorted({r for r in roots}, key=lambda r: (-size[r], r))
+        label_of = {r: k for k, r in enumerate(order)}
+        labels = array('i', (label_of[r] for r in roots))
+        return cls(index, labels, array('i', (size[r] for r in order)))
+
+    @classmethod
+    def from_graph(cls, graph: Graph) -> 'Components':
+        """
+        Componentes de um Graph, pelas arestas registradas em graph.edge_refs.
+        """
+        ids = list(graph.nodes)
+        # Ids sequenciais (gerados pelo loader) dispensam o dicionário de índices
+        index = None if ids == list(range(len(ids))) else {nid: i for i, nid in enumerate(ids)}
+        pos = (lambda nid: nid) if index is None else index.__getitem__
+        pairs = ((pos(src.id), pos(dst.id)) for src, _, dst, _ in graph.edge_refs)
+        return cls.build(len(ids), pairs, index)
+
+    @classmethod
+    def from_csr(cls, offsets, targets, index: Optional[Mapping[NodeId, int]] = None) -> 'Components':
+        """
+        Componentes de um grafo em formato CSR (ver CompactGraph).
+        """
+        n = len(offsets) - 1
+        pairs = ((u, targets[e]) for u in range(n) for e in range(offsets[u], offsets[u + 1]))
+        return cls.build(n, pairs, index)
+
+    @property
+    def count(self) -> int:
+        return len(self.sizes)
+
+    def label(self, node_id: NodeId) -> int:
+        return self.labels[node_id if self.index is None else self.index[node_id]]
+
+    def connected(self, id1: NodeId, id2: NodeId) -> bool:
+        """
+        Indica se os dois nós estão no mesmo componente (condição necessária para haver caminho).
+        """
+        return self.label(id1) == self.label(id2)
+
+    def summary(self) -> str:
+        n = len(self.labels)
+        largest = self.sizes[0] if self.sizes else 0
+        pct = 100 * largest / n if n else 0.0
+        return f"{self.count} componentes; o maior tem {largest} de {n} nós ({pct:.1f}%)"
+
+def largest_component(graph: Graph, components: Optional[Components] = None) -> Graph:
+    """
+    Novo Graph só com os nós e arestas do maior componente, mantendo a ordem original.
+    Ids sequenciais 0..n-1 são renumerados para continuarem sequenciais; outros ids são mantidos.
+    Os pesos atuais passam a ser os pesos originais das arestas (com novos ids de aresta).
+    """
+    components = components or Components.from_graph(graph)
+    labels = components.labels
+    renumber = components.index is None
+    new_ids = {}
+    result = Graph()
+    for pos, (nid, node) in enumerate(graph.nodes.items()):
+        if labels[pos] == 0:
+            new_ids[nid] = len(new_ids) if renumber else nid
+            result.add_node(new_ids[nid], node.x, node.y)
+    for src, i, dst, _ in graph.edge_refs:
+        if src.id in new_ids:
+            _, w, name = src.edges[i]
+            result.add_edge(new_ids[src.id], new_ids[dst.id], w, name)
+    result.components = Components.from_graph(result)
+    return result
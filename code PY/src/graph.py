@@ -1,10 +1,20 @@
+import hashlib
 import heapq
 import math
-from typing import Dict, List, Tuple
+import time
+from array import array
+from typing import Callable, Dict, Iterable, List, Optional, Set, Tuple, Union
+from stats import Probe, SearchStats
 
 # Constante para o raio da Terra em metros (usada no cálculo de distâncias geográficas)
 RAIO_TERRA_M = 6371000
 
+# Identificador de nó: inteiro (gerado pelo loader) ou string
+NodeId = Union[int, str]
+
+# Conjunto de arestas ignoradas em uma consulta: (id origem, id destino, peso), nos dois sentidos
+ExcludedEdges = Set[Tuple[NodeId, NodeId, float]]
+
 def haversine_distance(lat1: float, lon1: float, lat2: float, lon2: float) -> float:
     """
     Calcula a distância em metros entre duas coordenadas geográficas (latitude/longitude)
@@ -23,8 +33,11 @@ def haversine_distance(lat1: float, lon1: float, lat2: float, lon2: float) -> fl
 class Node:
     """
     Representa um nó do grafo, com identificador, coordenadas e lista de arestas.
+    Usa __slots__ para evitar um dicionário de atributos por nó.
     """
-    def __init__(self, id: str, x: float, y: float):
+    __slots__ = ('id', 'x', 'y', 'edges')
+
+    def __init__(self, id: NodeId, x: float, y: float):
         self.id = id
         self.x = x  # Longitude
         self.y = y  # Latitude
@@ -41,55 +54,291 @@ class Graph:
     Estrutura principal do grafo, armazena os nós e permite executar algoritmos de caminhos mínimos.
     """
     def __init__(self):
-        self.nodes: Dict[str, Node] = {}
+        self.nodes: Dict[NodeId, Node] = {}
+        # Hierarquia de contração opcional (ver ch.py), usada pelo método 'CH'
+        self.hierarchy = None
+        # Tabelas de landmarks opcionais (ver alt.py), usadas pelo método 'ALT'
+        self.landmarks = None
+        # Grafo simplificado opcional (ver simplify.py), em que rodam as demais buscas
+        self.simplified = None
+        # Componentes conexos opcionais (ver components.py), usados para recusar pares sem caminho em O(1)
+        self.components = None
+        # Cache de rotas opcional (ver routecache.py), consultado por shortest_path
+        self.route_cache = None
+        # Incrementada a cada alteração do grafo; caches guardam a versão em que foram preenchidos
+        self.version = 0
+        # Para cada aresta (pelo id estável devolvido por add_edge): nó u, posição em u.edges,
+        # nó v e posição em v.edges; e o peso com que a aresta foi criada
+        self.edge_refs: List[Tuple[Node, int, Node, int]] = []
+        self.base_weights = array('d')
 
-    def add_node(self, id: str, x: float, y: float):
+    def add_node(self, id: NodeId, x: float, y: float):
         """
         Adiciona um novo nó ao grafo.
         """
         if id not in self.nodes:
             self.nodes[id] = Node(id, x, y)
+            self.hierarchy = None
+            self.landmarks = None
+            self.simplified = None
+            self.components = None
+            self.version += 1
 
-    def add_edge(self, src_id: str, dst_id: str, w: float, name: str = ""):
+    def add_edge(self, src_id: NodeId, dst_id: NodeId, w: float, name: str = "") -> Optional[int]:
         """
         Adiciona uma aresta bidirecional entre dois nós do grafo.
+        Retorna o id da aresta (sequencial, na ordem de criação), usado para alterar seu peso
+        depois (ver update_edges), ou None se algum dos nós não existir.
         """
         if src_id in self.nodes and dst_id in self.nodes:
             src = self.nodes[src_id]
             dst = self.nodes[dst_id]
             src.add_edge(dst, w, name)
+            i = len(src.edges) - 1
             dst.add_edge(src, w, name)
+            # Hierarquia, landmarks, grafo simplificado e componentes calculados antes não representam mais o grafo
+            self.hierarchy = None
+            self.landmarks = None
+            self.simplified = None
+            self.components = None
+            self.version += 1
+            return self._register_edge(src, i, dst, len(dst.edges) - 1)
+        return None
+
+    def _register_edge(self, src: Node, i: int, dst: Node, j: int) -> int:
+        """
+        Registra as duas entradas de uma aresta já inserida nas listas de adjacência e retorna seu id.
+        """
+        self.edge_refs.append((src, i, dst, j))
+        self.base_weights.append(src.edges[i][1])
+        return len(self.edge_refs) - 1
+
+    def edge(self, edge_id: int) -> Tuple[Node, Node, float, str]:
+        """
+        Retorna a aresta com o id informado: (nó origem, nó destino, peso atual, nome da rua).
+        """
+        src, i, _, _ = self.edge_refs[edge_id]
+        dest, w, name = src.edges[i]
+        return src, dest, w, name
+
+    def set_edge_weight(self, edge_id: int, weight: float) -> int:
+        """
+        Altera o peso de uma aresta (nos dois sentidos). Ver update_edges.
+        """
+        return self.update_edges([(edge_id, weight)])
+
+    def disable_edge(self, edge_id: int) -> int:
+        """
+        Interdita uma aresta: o peso passa a ser infinito e nenhuma busca a utiliza.
+        """
+        return self.update_edges([(edge_id, math.inf)])
+
+    def restore_edge(self, edge_id: int) -> int:
+        """
+        Volta a aresta ao peso com que foi criada.
+        """
+        return self.update_edges([(edge_id, self.base_weights[edge_id])])
+
+    def update_edges(self, updates: Iterable[Tuple[int, float]]) -> int:
+        """
+        Aplica um lote de alterações (id da aresta, novo peso); math.inf interdita a aresta.
+        Cada alteração troca as duas entradas da aresta nas listas de adjacência em O(1),
+        sem recriar o grafo. Se uma aresta aparece mais de uma vez no lote, vale o último peso.
+        O peso não pode ficar abaixo da distância em linha reta entre os nós (nem do peso
+        original), o que mantém válidas as heurísticas de Haversine e de landmarks.
+        Os dados pré-calculados são reparados em vez de recalculados: o cache de rotas descarta
+        apenas as rotas e árvores afetadas (e corrige as árvores quando um peso diminui), as
+        tabelas de landmarks são corrigidas onde uma distância diminuiu, as arestas do grafo
+        simplificado que contêm as alteradas têm o peso recalculado e a hierarquia de
+        contração, cujos atalhos dependem das buscas de testemunha, é descartada
+        ('CH' passa a usar o Dijkstra bidirecional até ser reconstruída).
+        O lote é validado por inteiro antes de qualquer alteração.
+        Retorna o número de arestas cujo peso mudou.
+        """
+        latest: Dict[int, float] = {}
+        for edge_id, weight in updates:
+            self.check_edge_weight(edge_id, weight)
+            latest[edge_id] = weight
+
+        changes, changed_ids = [], []
+        for edge_id, weight in latest.items():
+            src, i, dst, j = self.edge_refs[edge_id]
+            _, old, name = src.edges[i]
+            if weight == old:
+                continue
+            src.edges[i] = (dst, weight, name)
+            dst.edges[j] = (src, weight, name)
+            changes.append((src.id, dst.id, old, weight))
+            changed_ids.append(edge_id)
+
+        if changes:
+            self._repair(changes, changed_ids)
+        return len(changes)
+
+    def check_edge_weight(self, edge_id: int, weight: float):
+        """
+        Lança ValueError se edge_id não for o id de uma aresta (inteiro de 0 a len(edge_refs) - 1)
+        ou se o peso ficar abaixo do mínimo aceito por update_edges.
+        """
+        if not isinstance(edge_id, int) or not 0 <= edge_id < len(self.edge_refs):
+            raise ValueError(f"Aresta inexistente: {edge_id!r}")
+        src, _, dst, _ = self.edge_refs[edge_id]
+        floor = min(self.base_weights[edge_id], haversine_distance(src.y, src.x, dst.y, dst.x))
+        if not weight >= floor * (1 - 1e-9):
+            raise ValueError(f"Peso {weight} inválido para a aresta {edge_id} (mínimo {floor:.3f})")
+
+    def _repair(self, changes: List[Tuple[NodeId, NodeId, float, float]], edge_ids: List[int]):
+        """
+        Ajusta hierarquia, landmarks, grafo simplificado e cache de rotas a alterações
+        (u, v, peso antigo, peso novo) das arestas edge_ids.
+        """
+        self.hierarchy = None
+        if self.simplified is not None:
+            self.simplified.edges_changed(edge_ids)
+        decreased = [(u, v, new) for u, v, old, new in changes if new < old]
+        if self.landmarks is not None and decreased:
+            self.landmarks.repair(self, decreased)
+        if self.route_cache is not None:
+            self.route_cache.sync(self.version)
+            self.route_cache.edges_changed(changes, self._propagate_decrease, self._straight_distance)
+
+    def _straight_distance(self, id1: NodeId, id2: NodeId) -> float:
+        node1, node2 = self.nodes[id1], self.nodes[id2]
+        return haversine_distance(node1.y, node1.x, node2.y, node2.x)
 
-    def _dijkstra(self, start_id: str) -> Tuple[Dict[str, float], Dict[str, str]]:
+    def _propagate_decrease(self, dist: Dict[NodeId, float], prev: Dict[NodeId, NodeId],
+                            decreased: List[Tuple[NodeId, NodeId, float]]):
+        """
+        Corrige uma árvore de menores caminhos (dist, prev) após a redução do peso das arestas
+        em decreased: só os nós cuja distância diminui são revisitados.
+        """
+        pq = []
+        for a, b, w in decreased:
+            for x, y in ((a, b), (b, a)):
+                if x in dist and dist[x] + w < dist.get(y, math.inf):
+                    dist[y] = dist[x] + w
+                    prev[y] = x
+                    heapq.heappush(pq, (dist[y], y))
+        while pq:
+            d, x = heapq.heappop(pq)
+            if d > dist[x]:
+                continue
+            for node, w, _ in self.nodes[x].edges:
+                if d + w < dist.get(node.id, math.inf):
+                    dist[node.id] = d + w
+                    prev[node.id] = x
+                    heapq.heappush(pq, (d + w, node.id))
+
+    def weights_digest(self) -> bytes:
+        """
+        SHA-256 dos pesos de todas as arestas (na ordem dos nós e das listas de adjacência),
+        usado para reconhecer arquivos pré-calculados com pesos antigos.
+        """
+        h = hashlib.sha256()
+        for node in self.nodes.values():
+            h.update(array('d', (w for _, w, _ in node.edges)).tobytes())
+        return h.digest()
+
+    def _dijkstra(self, start_id: NodeId, end_id: Optional[NodeId] = None, excluded: ExcludedEdges = frozenset(),
+                  _push=heapq.heappush, _pop=heapq.heappop) -> Tuple[Dict[NodeId, float], Dict[NodeId, NodeId]]:
         """
         Implementa o algoritmo de Dijkstra para encontrar o menor caminho a partir de um nó de origem
         para todos os outros nós do grafo.
-        Retorna: dicionário de distâncias mínimas e dicionário de predecessores.
+        Se end_id for informado, a busca é interrompida assim que o destino é fixado (modo ponto a ponto).
+        Arestas presentes em excluded são ignoradas, sem alterar o grafo.
+        Retorna: dicionário de distâncias mínimas e dicionário de predecessores
+        (nós não alcançados não aparecem no dicionário de distâncias).
+        _push e _pop são trocados apenas pela instrumentação (ver stats.Probe).
         """
-        dist = {nid: math.inf for nid in self.nodes}
-        prev: Dict[str, str] = {}
-        dist[start_id] = 0
-        
+        dist: Dict[NodeId, float] = {start_id: 0}
+        prev: Dict[NodeId, NodeId] = {}
+
         # Fila de prioridade: (distância acumulada, id do nó)
         pq = [(0, start_id)]
 
         while pq:
-            d, u_id = heapq.heappop(pq)
+            d, u_id = _pop(pq)
 
             # Se já encontramos um caminho menor, ignoramos este
             if d > dist[u_id]:
                 continue
 
+            # No modo ponto a ponto, o destino fixado encerra a busca
+            if u_id == end_id:
+                break
+
             u_node = self.nodes[u_id]
             for v_node, w, _ in u_node.edges:
-                if dist[u_id] + w < dist[v_node.id]:
-                    dist[v_node.id] = dist[u_id] + w
+                if excluded and (u_id, v_node.id, w) in excluded:
+                    continue
+                if d + w < dist.get(v_node.id, math.inf):
+                    dist[v_node.id] = d + w
                     prev[v_node.id] = u_id
-                    heapq.heappush(pq, (dist[v_node.id], v_node.id))
-                    
+                    _push(pq, (d + w, v_node.id))
+
         return dist, prev
-    
-    def _heuristic(self, node_id1: str, node_id2: str) -> float:
+
+    def _bidirectional_dijkstra_prev(self, start_id: NodeId, end_id: NodeId, excluded: ExcludedEdges = frozenset(),
+                                     _push=heapq.heappush, _pop=heapq.heappop) -> Dict[NodeId, NodeId]:
+        """
+        Dijkstra bidirecional: expande alternadamente a partir da origem e do destino
+        e para quando a soma dos topos das duas filas não pode mais melhorar o melhor
+        encontro conhecido. Como as arestas são bidirecionais, a busca reversa percorre
+        as mesmas listas de adjacência.
+        Retorna um dicionário de predecessores contendo apenas o caminho encontrado.
+        """
+        if start_id == end_id:
+            return {}
+
+        dist = ({start_id: 0}, {end_id: 0})
+        prev: Tuple[Dict[NodeId, NodeId], Dict[NodeId, NodeId]] = ({}, {})
+        pq = ([(0, start_id)], [(0, end_id)])
+        settled = (set(), set())
+
+        best, meet = math.inf, None
+        side = 0
+
+        while pq[0] and pq[1]:
+            # Critério de parada: nenhum caminho ainda não visto pode ser menor que o melhor encontro
+            if pq[0][0][0] + pq[1][0][0] >= best:
+                break
+
+            d, u_id = _pop(pq[side])
+            if u_id in settled[side]:
+                side ^= 1
+                continue
+            settled[side].add(u_id)
+
+            other_dist = dist[side ^ 1]
+            for v_node, w, _ in self.nodes[u_id].edges:
+                v_id = v_node.id
+                # As arestas excluídas são registradas nos dois sentidos, então a busca reversa também as ignora
+                if excluded and (u_id, v_id, w) in excluded:
+                    continue
+                if d + w < dist[side].get(v_id, math.inf):
+                    dist[side][v_id] = d + w
+                    prev[side][v_id] = u_id
+                    _push(pq[side], (d + w, v_id))
+                # Atualiza o melhor ponto de encontro entre as duas fronteiras
+                if v_id in other_dist and d + w + other_dist[v_id] < best:
+                    best, meet = d + w + other_dist[v_id], v_id
+
+            side ^= 1
+
+        if meet is None:
+            return {}
+
+        # Monta a sequência de nós: origem -> encontro (busca direta) e encontro -> destino (busca reversa)
+        nodes_path = [meet]
+        while nodes_path[-1] in prev[0]:
+            nodes_path.append(prev[0][nodes_path[-1]])
+        nodes_path.reverse()
+        while nodes_path[-1] in prev[1]:
+            nodes_path.append(prev[1][nodes_path[-1]])
+
+        return {nodes_path[i + 1]: nodes_path[i] for i in range(len(nodes_path) - 1)}
+
+    def _heuristic(self, node_id1: NodeId, node_id2: NodeId) -> float:
         """
         Heurística para o algoritmo A*.
         Utiliza a distância de Haversine entre dois nós do grafo (latitude/longitude).
@@ -98,86 +347,379 @@ class Graph:
         node2 = self.nodes[node_id2]
         return haversine_distance(node1.y, node1.x, node2.y, node2.x)
 
-    def _astar_prev(self, start_id: str, end_id: str) -> Dict[str, str]:
+    def _astar_prev(self, start_id: NodeId, end_id: NodeId, excluded: ExcludedEdges = frozenset(),
+                    potential: Optional[Callable[[NodeId], Optional[float]]] = None,
+                    _push=heapq.heappush, _pop=heapq.heappop, _h=haversine_distance) -> Dict[NodeId, NodeId]:
         """
         Implementa o algoritmo A* para encontrar o menor caminho entre dois nós do grafo.
-        Usa a heurística de Haversine para guiar a busca.
+        Usa a heurística de Haversine para guiar a busca e uma fila de prioridade (heap)
+        para escolher o próximo nó. A busca termina assim que o destino é retirado da fila.
+        O estado da busca (g_score, predecessores) guarda apenas os nós efetivamente visitados.
+        Se potential for informado (função que dá um limite inferior da distância até o destino,
+        como as distâncias exatas de uma árvore ou os limites de landmarks), ela substitui a
+        heurística de Haversine; nós para os quais ela retorna None não alcançam o destino e são ignorados.
+        _push, _pop e _h são trocados apenas pela instrumentação (ver stats.Probe).
         Retorna um dicionário de predecessores para reconstrução do caminho.
         """
-        open_set = {start_id}
-        came_from: Dict[str, str] = {}
-        
-        g_score = {nid: math.inf for nid in self.nodes}
-        g_score[start_id] = 0
-        
-        f_score = {nid: math.inf for nid in self.nodes}
-        f_score[start_id] = self._heuristic(start_id, end_id)
-
-        while open_set:
-            # Seleciona o nó com menor f_score
-            current = min(open_set, key=lambda nid: f_score[nid])
-            
+        came_from: Dict[NodeId, NodeId] = {}
+        g_score: Dict[NodeId, float] = {start_id: 0}
+        closed = set()
+
+        # Coordenadas do destino, usadas no cálculo da heurística a cada relaxamento
+        end = self.nodes[end_id]
+
+        # Fila de prioridade: (f_score, g_score, id do nó)
+        if potential is not None:
+            h_start = potential(start_id) or 0
+        else:
+            start = self.nodes[start_id]
+            h_start = _h(start.y, start.x, end.y, end.x)
+        pq = [(h_start, 0, start_id)]
+
+        while pq:
+            _, g, current = _pop(pq)
+
+            # Entradas obsoletas (nó já fechado com custo menor) são descartadas
+            if current in closed:
+                continue
+
             if current == end_id:
                 return came_from
-            
-            open_set.remove(current)
-            
+
+            closed.add(current)
+
             for neighbor, w, _ in self.nodes[current].edges:
-                tentative_g = g_score[current] + w
-                if tentative_g < g_score[neighbor.id]:
+                if excluded and (current, neighbor.id, w) in excluded:
+                    continue
+                tentative_g = g + w
+                if tentative_g < g_score.get(neighbor.id, math.inf):
+                    if potential is not None:
+                        h = potential(neighbor.id)
+                        if h is None:
+                            continue
+                    else:
+                        h = _h(neighbor.y, neighbor.x, end.y, end.x)
                     came_from[neighbor.id] = current
                     g_score[neighbor.id] = tentative_g
-                    f_score[neighbor.id] = tentative_g + self._heuristic(neighbor.id, end_id)
-                    if neighbor.id not in open_set:
-                        open_set.add(neighbor.id)
-                        
+                    _push(pq, (tentative_g + h, tentative_g, neighbor.id))
+
         return came_from
 
-    def shortest_path(self, start_id: str, end_id: str, method: str) -> List[Tuple[Node, Node, float, str]]:
+    def _search_prev(self, start_id: NodeId, end_id: NodeId, method: str,
+                     excluded: ExcludedEdges = frozenset()) -> Dict[NodeId, NodeId]:
         """
-        Calcula o menor caminho entre dois nós usando Dijkstra ('D') ou A* (qualquer outro valor).
-        Retorna uma lista de tuplas representando o caminho encontrado: (nó origem, nó destino, peso, nome da rua)
+        Executa o método escolhido e retorna o dicionário de predecessores.
+        """
+        method = method.upper()
+        if self.simplified is not None and not self._uses_preprocessing(method, excluded):
+            return self.simplified.prev_for(start_id, end_id, method, excluded)
+        if method == 'CH':
+            # Sem hierarquia construída (ou com arestas excluídas, que ela não representa), usa o Dijkstra bidirecional
+            if self.hierarchy is not None and not excluded:
+                return self.hierarchy.prev_for(start_id, end_id)
+            method = 'DB'
+        if method == 'ALT' and self.landmarks is not None:
+            return self._astar_prev(start_id, end_id, excluded, self.landmarks.potential(start_id, end_id))
+        if method == 'D':
+            return self._dijkstra(start_id, excluded=excluded)[1]
+        if method == 'DP':
+            return self._dijkstra(start_id, end_id, excluded)[1]
+        if method == 'DB':
+            return self._bidirectional_dijkstra_prev(start_id, end_id, excluded)
+        return self._astar_prev(start_id, end_id, excluded)
+
+    def _uses_preprocessing(self, method: str, excluded: ExcludedEdges) -> bool:
+        """
+        Indica se a consulta usa a hierarquia ou os landmarks, construídos sobre o grafo original;
+        as demais rodam no grafo simplificado, quando definido.
+        """
+        return ((method == 'CH' and self.hierarchy is not None and not excluded) or
+                (method == 'ALT' and self.landmarks is not None))
+
+    def _probed_search(self, start_id: NodeId, end_id: NodeId, method: str, excluded: ExcludedEdges,
+                       stats: SearchStats) -> Dict[NodeId, NodeId]:
         """
-        prev = {}
-        if method.upper() == 'D':
-            _, prev = self._dijkstra(start_id)
+        Mesmo despacho de _search_prev, com os ganchos de contagem da instrumentação.
+        Os contadores e o tempo da busca são somados em stats.
+        """
+        method = method.upper()
+        if self.simplified is not None and not self._uses_preprocessing(method, excluded):
+            return self.simplified.prev_for(start_id, end_id, method, excluded,
+                                            lambda view, *args: view._probed_search(*args, stats))
+        degree = lambda nid: len(self.nodes[nid].edges)
+        t0 = time.perf_counter()
+        if method == 'CH' and self.hierarchy is not None and not excluded:
+            ch = self.hierarchy
+            probe = Probe(lambda i: ch.up_offsets[i + 1] - ch.up_offsets[i])
+            prev = ch.prev_for(start_id, end_id, probe.push, probe.pop)
+        elif method in ('D', 'DP'):
+            probe = Probe(degree, end_id if method == 'DP' else None)
+            prev = self._dijkstra(start_id, end_id if method == 'DP' else None, excluded, probe.push, probe.pop)[1]
+        elif method in ('DB', 'CH'):
+            probe = Probe(degree)
+            prev = self._bidirectional_dijkstra_prev(start_id, end_id, excluded, probe.push, probe.pop)
         else:
-            prev = self._astar_prev(start_id, end_id)
+            probe = Probe(degree, end_id)
+            potential = None
+            if method == 'ALT' and self.landmarks is not None:
+                potential = probe.timed(self.landmarks.potential(start_id, end_id))
+            prev = self._astar_prev(start_id, end_id, excluded, potential, probe.push, probe.pop,
+                                    probe.timed(haversine_distance))
+        stats.record(probe, time.perf_counter() - t0, 0.0)
+        return prev
 
+    def _build_path(self, prev: Dict[NodeId, NodeId], end_id: NodeId,
+                    excluded: ExcludedEdges = frozenset()) -> List[Tuple[Node, Node, float, str]]:
+        """
+        Reconstrói o caminho a partir dos predecessores, do destino até a origem,
+        usando apenas arestas que não estão em excluded. Entre arestas paralelas,
+        escolhe a de menor peso (a mesma considerada pela busca).
+        """
         path = []
         u = end_id
         while u in prev:
             p = prev[u]
+            best = None
             for dest, w, name in self.nodes[p].edges:
-                if dest.id == u:
-                    path.insert(0, (self.nodes[p], dest, w, name))
-                    break
+                if dest.id == u and not (excluded and (p, u, w) in excluded):
+                    if best is None or w < best[2]:
+                        best = (self.nodes[p], dest, w, name)
+            if best:
+                path.append(best)
             u = p
+        path.reverse()
         return path
 
-    def shortest_two_paths(self, start_id: str, end_id: str, method: str) -> Tuple[List, List]:
+    def shortest_path(self, start_id: NodeId, end_id: NodeId, method: str,
+                      excluded: ExcludedEdges = frozenset()) -> List[Tuple[Node, Node, float, str]]:
+        """
+        Calcula o menor caminho entre dois nós usando Dijkstra ('D'), Dijkstra ponto a ponto ('DP'),
+        Dijkstra bidirecional ('DB'), hierarquia de contração ('CH', se self.hierarchy estiver definida),
+        A* com landmarks ('ALT', se self.landmarks estiver definida) ou A* (qualquer outro valor).
+        Com self.simplified definido, os métodos que não usam hierarquia nem landmarks buscam no
+        grafo simplificado, e o caminho retornado continua com todas as arestas originais.
+        Arestas em excluded são ignoradas apenas nesta consulta; o grafo não é modificado.
+        Com self.route_cache definido, consultas sem arestas excluídas passam pelo cache.
+        Com self.components definido, nós em componentes diferentes retornam [] sem nenhuma busca.
+        Retorna uma lista de tuplas representando o caminho encontrado: (nó origem, nó destino, peso, nome da rua)
+        """
+        if self.components is not None and not self.components.connected(start_id, end_id):
+            return []
+        if self.route_cache is not None and not excluded:
+            return self._cached_path(start_id, end_id, method)
+        prev = self._search_prev(start_id, end_id, method, excluded)
+        return self._build_path(prev, end_id, excluded)
+
+    def _cached_path(self, start_id: NodeId, end_id: NodeId, method: str) -> List[Tuple[Node, Node, float, str]]:
+        """
+        shortest_path através do cache de rotas. Sem acerto, a rota sai da árvore de menores
+        caminhos da origem, se já existir, ou de uma nova árvore quando a origem se repete
+        (ou o método é 'D', que já calcula a árvore inteira); caso contrário, do método escolhido.
+        Rotas tiradas da árvore têm a mesma distância do método pedido, mas, em empates,
+        podem passar por ruas diferentes.
+        """
+        cache = self.route_cache
+        cache.sync(self.version)
+        key = (start_id, end_id, method.upper())
+        path = cache.get_route(key)
+        if path is None:
+            tree = cache.cached_tree(start_id)
+            if tree is None and (key[2] == 'D' or cache.wants_tree(start_id)):
+                tree = self._tree(start_id)
+            prev = tree[1] if tree is not None else self._search_prev(start_id, end_id, method)
+            path = self._build_path(prev, end_id)
+            cache.put_route(key, path)
+        return list(path)
+
+    def _tree(self, start_id: NodeId) -> Tuple[Dict[NodeId, float], Dict[NodeId, NodeId]]:
+        """
+        Árvore completa de menores caminhos a partir de start_id (Dijkstra sem destino),
+        reaproveitada do cache de rotas quando ele está ativo. O resultado não deve ser alterado.
+        """
+        if self.route_cache is None:
+            return self._dijkstra(start_id)
+        self.route_cache.sync(self.version)
+        return self.route_cache.tree(start_id, lambda: self._dijkstra(start_id))
+
+    def shortest_two_paths(self, start_id: NodeId, end_id: NodeId, method: str) -> Tuple[List, List]:
         """
         Calcula os dois menores caminhos entre dois nós.
         1. Encontra o melhor caminho (ótimo).
-        2. Remove as arestas desse caminho e encontra o segundo melhor caminho possível.
-        3. Restaura as arestas removidas.
+        2. Encontra o segundo melhor caminho ignorando as arestas do primeiro (nos dois sentidos).
+        As arestas ignoradas ficam em um conjunto próprio da consulta, sem alterar o grafo,
+        então várias consultas podem rodar em paralelo sobre o mesmo grafo.
         Retorna: (primeiro caminho, segundo caminho).
         """
         p1 = self.shortest_path(start_id, end_id, method)
         if not p1: return [], []
 
-        removed_edges = []
-        # Remove arestas do primeiro caminho
-        for u, v, w, name in p1:
-            self.nodes[u.id].edges = [e for e in self.nodes[u.id].edges if not (e[0].id == v.id and e[1] == w)]
-            self.nodes[v.id].edges = [e for e in self.nodes[v.id].edges if not (e[0].id == u.id and e[1] == w)]
-            removed_edges.append((u.id, v.id, w, name))
-
-        # Calcula o segundo melhor caminho sem as arestas removidas
-        p2 = self.shortest_path(start_id, end_id, method)
-
-        # Restaura as arestas removidas
-        for u_id, v_id, w, name in removed_edges:
-            self.add_edge(u_id, v_id, w, name)
-            
-        return p1, p2
\ No newline at end of file
+        excluded = self._path_edges(p1)
+        p2 = self.shortest_path(start_id, end_id, method, excluded)
+        return p1, p2
+
+    def _path_edges(self, path: List[Tuple[Node, Node, float, str]]) -> ExcludedEdges:
+        """
+        Arestas de um caminho nos dois sentidos, no formato do conjunto de exclusão.
+        """
+        excluded = set()
+        for u, v, w, _ in path:
+            excluded.add((u.id, v.id, w))
+            excluded.add((v.id, u.id, w))
+        return excluded
+
+    def _profiled_path(self, start_id: NodeId, end_id: NodeId, method: str, excluded: ExcludedEdges,
+                       stats: SearchStats) -> List[Tuple[Node, Node, float, str]]:
+        """
+        Busca instrumentada seguida da reconstrução do caminho, cujo tempo também é somado em stats.
+        """
+        if self.components is not None and not self.components.connected(start_id, end_id):
+            return []
+        prev = self._probed_search(start_id, end_id, method, excluded, stats)
+        t0 = time.perf_counter()
+        path = self._build_path(prev, end_id, excluded)
+        stats.reconstruction_ms += (time.perf_counter() - t0) * 1000
+        return path
+
+    def shortest_path_with_stats(self, start_id: NodeId, end_id: NodeId, method: str,
+                                 excluded: ExcludedEdges = frozenset()) -> Tuple[List, SearchStats]:
+        """
+        shortest_path instrumentado: retorna o caminho e as estatísticas da consulta
+        (nós fixados, arestas examinadas, operações na fila, chamadas da heurística e tempo de cada fase).
+        Não passa pelo cache de rotas. As buscas comuns não pagam nenhum custo pela instrumentação.
+        """
+        stats = SearchStats()
+        stats.queries = 1
+        return self._profiled_path(start_id, end_id, method, excluded, stats), stats
+
+    def shortest_two_paths_with_stats(self, start_id: NodeId, end_id: NodeId, method: str) -> Tuple[List, List, SearchStats]:
+        """
+        shortest_two_paths instrumentado: retorna os dois caminhos e as estatísticas somadas das duas buscas.
+        """
+        stats = SearchStats()
+        stats.queries = 1
+        p1 = self._profiled_path(start_id, end_id, method, frozenset(), stats)
+        if not p1:
+            return [], [], stats
+        p2 = self._profiled_path(start_id, end_id, method, self._path_edges(p1), stats)
+        return p1, p2, stats
+
+    def _tree_path(self, start_id: NodeId, end_id: NodeId, next_hop: Dict[NodeId, NodeId],
+                   excluded: ExcludedEdges) -> Optional[List[Tuple[Node, Node, float, str]]]:
+        """
+        Segue a árvore de menores caminhos (next_hop) de start_id até end_id.
+        Retorna o caminho se nenhuma aresta usada estiver em excluded, ou None caso contrário.
+        """
+        prev: Dict[NodeId, NodeId] = {}
+        u = start_id
+        while u != end_id:
+            if u not in next_hop:
+                return None
+            v = next_hop[u]
+            w = min(w for dest, w, _ in self.nodes[u].edges if dest.id == v)
+            if (u, v, w) in excluded:
+                return None
+            prev[v] = u
+            u = v
+        return self._build_path(prev, end_id, excluded)
+
+    def k_shortest_paths(self, start_id: NodeId, end_id: NodeId, k: int, method: str) -> List[List[Tuple[Node, Node, float, str]]]:
+        """
+        Calcula até k menores caminhos sem ciclos entre dois nós (algoritmo de Yen).
+        Cada novo caminho desvia do anterior em um "nó de desvio" (spur): o prefixo até ele
+        é mantido e o restante é buscado ignorando, via conjunto de exclusão, as arestas já
+        usadas com o mesmo prefixo e os nós do prefixo.
+        Uma única busca a partir do destino é reaproveitada por todos os desvios: se o caminho
+        na árvore de menores caminhos até o destino não toca nenhuma aresta excluída, ele é usado
+        diretamente; senão, o desvio é calculado por A* com as distâncias exatas dessa árvore
+        como heurística (o método escolhido é usado apenas no primeiro caminho).
+        Com a modificação de Lawler, os desvios de um caminho só são tentados a partir do
+        ponto em que ele mesmo desviou do seu pai, pois os anteriores já foram calculados;
+        o custo de cada prefixo vem das somas acumuladas do caminho, sem nova busca.
+        Retorna a lista de caminhos em ordem crescente de distância.
+        """
+        first = self.shortest_path(start_id, end_id, method)
+        if not first or k <= 0:
+            return []
+
+        def node_seq(path):
+            return [path[0][0].id] + [v.id for _, v, _, _ in path]
+
+        # Árvore de menores caminhos até o destino (as arestas são bidirecionais, então
+        # os predecessores de uma busca a partir do destino são o próximo passo até ele).
+        # Serve de cache para os desvios cujo melhor caminho não usa arestas excluídas.
+        dist_to_end, to_end = self._tree(end_id)
+
+        found = [first]
+        found_nodes = [node_seq(first)]
+        deviations = [0]
+        seen = {tuple(found_nodes[0])}
+
+        # Candidatos: (distância total, desempate, caminho, índice do nó de desvio)
+        candidates = []
+        counter = 0
+
+        while len(found) < k:
+            last, last_nodes = found[-1], found_nodes[-1]
+
+            # Custos acumulados do caminho anterior: custo do prefixo até cada nó
+            prefix_cost = [0.0]
+            for _, _, w, _ in last:
+                prefix_cost.append(prefix_cost[-1] + w)
+
+            for i in range(deviations[-1], len(last)):
+                spur_id = last_nodes[i]
+                root = last_nodes[:i + 1]
+                excluded = set()
+
+                # Arestas que saem do nó de desvio em caminhos já encontrados com o mesmo prefixo
+                # (incluindo arestas paralelas, que levariam à mesma sequência de nós)
+                for nodes in found_nodes:
+                    if len(nodes) > i + 1 and nodes[:i + 1] == root:
+                        nxt = nodes[i + 1]
+                        for v, w, _ in self.nodes[spur_id].edges:
+                            if v.id == nxt:
+                                excluded.add((spur_id, nxt, w))
+                                excluded.add((nxt, spur_id, w))
+
+                # Nós do prefixo (exceto o de desvio) ficam inacessíveis para evitar ciclos
+                for nid in root[:-1]:
+                    for v, w, _ in self.nodes[nid].edges:
+                        excluded.add((nid, v.id, w))
+                        excluded.add((v.id, nid, w))
+
+                spur = self._tree_path(spur_id, end_id, to_end, excluded)
+                if spur is None:
+                    prev = self._astar_prev(spur_id, end_id, excluded, dist_to_end.get)
+                    spur = self._build_path(prev, end_id, excluded)
+                if not spur:
+                    continue
+
+                path = last[:i] + spur
+                key = tuple(root[:-1]) + tuple(node_seq(spur))
+                if key in seen:
+                    continue
+                seen.add(key)
+
+                total = prefix_cost[i] + sum(w for _, _, w, _ in spur)
+                heapq.heappush(candidates, (total, counter, path, i))
+                counter += 1
+
+            if not candidates:
+                break
+
+            _, _, path, dev = heapq.heappop(candidates)
+            found.append(path)
+            found_nodes.append(node_seq(path))
+            deviations.append(dev)
+
+        return found
+
+    def distance_matrix(self, origins: List[NodeId], destinations: List[NodeId],
+                        workers: Optional[int] = None, cache_path: Optional[str] = None):
+        """
+        Matriz de distâncias entre cada origem e cada destino (uma busca por origem).
+        Ver matrix.distance_matrix para os detalhes do processamento em paralelo.
+        """
+        # Import local: matrix depende de compact e cache, que por sua vez importam este módulo
+        from matrix import distance_matrix
+        return distance_matrix(self, origins, destinations, workers, cache_path)
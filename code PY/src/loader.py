@@ -0,0 +1,157 @@
+import json
+import math
+import os
+import re
+from typing import Callable, Dict, Iterator, List, Optional, Sequence, Tuple
+from components import Components, largest_component
+from graph import Graph, RAIO_TERRA_M
+
+# Tamanho do bloco lido do arquivo a cada iteração (em caracteres)
+CHUNK_SIZE = 1 << 16
+
+# Aproximação de metros por grau, usada para converter a tolerância de agrupamento
+METROS_POR_GRAU = 111320.0
+
+_FEATURES_RE = re.compile(r'"features"\s*:\s*\[')
+
+def iter_features(path: str, chunk_size: int = CHUNK_SIZE,
+                  progress: Optional[Callable[[float], None]] = None) -> Iterator[dict]:
+    """
+    Lê as features de um FeatureCollection GeoJSON de forma incremental.
+    Apenas o trecho ainda não decodificado do arquivo fica em memória,
+    então o consumo é limitado pelo tamanho da maior feature e não do arquivo.
+    Se progress for informado, é chamado após cada bloco lido com a fração
+    aproximada do arquivo já lida (entre 0 e 1).
+    """
+    decoder = json.JSONDecoder()
+    total = os.path.getsize(path) or 1
+    read = 0
+
+    def read_chunk(f) -> str:
+        nonlocal read
+        chunk = f.read(chunk_size)
+        read += len(chunk)
+        if progress:
+            progress(min(read / total, 1.0))
+        return chunk
+
+    with open(path, 'r', encoding='utf-8') as f:
+        buf = ''
+        eof = False
+
+        # Avança até o início do vetor "features"
+        while True:
+            match = _FEATURES_RE.search(buf)
+            if match:
+                buf = buf[match.end():]
+                break
+            if eof:
+                return
+            chunk = read_chunk(f)
+            eof = not chunk
+            # Mantém o final do bloco, caso a chave esteja dividida entre duas leituras
+            buf = buf[-64:] + chunk
+
+        pos = 0
+        while True:
+            # Pula espaços e vírgulas entre as features
+            while pos < len(buf) and buf[pos] in ' \t\r\n,':
+                pos += 1
+
+            if pos < len(buf) and buf[pos] == ']':
+                return
+
+            try:
+                feat, end = decoder.raw_decode(buf, pos)
+            except json.JSONDecodeError:
+                # Feature incompleta: lê mais um bloco e tenta novamente
+                if eof:
+                    raise
+                chunk = read_chunk(f)
+                eof = not chunk
+                buf = buf[pos:] + chunk
+                pos = 0
+                continue
+
+            yield feat
+            pos = end
+
+def feature_points(feat: dict) -> Sequence[Sequence[float]]:
+    """
+    Extrai a lista de pontos (lon, lat) de uma feature.
+    Trata LineString e o anel externo de Polygon; outras geometrias são ignoradas.
+    """
+    geometry = feat.get('geometry')
+    if not geometry:
+        return []
+
+    coords = geometry.get('coordinates')
+    geom_type = geometry.get('type')
+    if geom_type == 'LineString':
+        return coords or []
+    if geom_type == 'Polygon' and coords:
+        return coords[0]
+    return []
+
+def segment_lengths(lons: Sequence[float], lats: Sequence[float]) -> List[float]:
+    """
+    Calcula em lote as distâncias de Haversine entre pontos consecutivos de uma linha.
+    Os radianos e cossenos de cada ponto são calculados uma única vez e reaproveitados
+    pelos dois segmentos que o compartilham.
+    """
+    rad_lons = [math.radians(v) for v in lons]
+    rad_lats = [math.radians(v) for v in lats]
+    cos_lats = [math.cos(v) for v in rad_lats]
+    sin, asin, sqrt = math.sin, math.asin, math.sqrt
+
+    lengths = []
+    for i in range(len(rad_lats) - 1):
+        a = (sin((rad_lats[i + 1] - rad_lats[i]) / 2) ** 2
+             + cos_lats[i] * cos_lats[i + 1] * sin((rad_lons[i + 1] - rad_lons[i]) / 2) ** 2)
+        lengths.append(2 * RAIO_TERRA_M * asin(sqrt(min(a, 1.0))))
+    return lengths
+
+def load_geojson(path: str, snap_tolerance_m: float = 0.0, chunk_size: int = CHUNK_SIZE,
+                 progress: Optional[Callable[[float], None]] = None, largest_only: bool = False) -> Graph:
+    """
+    Carrega um arquivo GeoJSON em um Graph, sem depender da interface gráfica.
+    Os nós recebem ids inteiros sequenciais. Com snap_tolerance_m > 0, pontos que caem
+    na mesma célula de uma grade com esse lado (em metros, aproximado) viram um único nó,
+    o que une vértices quase coincidentes de ruas diferentes.
+    Segmentos que ligam um nó a ele mesmo (pontos repetidos) são descartados.
+    progress é repassado a iter_features para acompanhar a leitura.
+    Ao final, os componentes conexos são calculados (graph.components); com largest_only,
+    apenas o maior componente é mantido (os nós são renumerados) e o restante é descartado.
+    """
+    graph = Graph()
+    node_ids: Dict[Tuple[float, float], int] = {}
+    cell = snap_tolerance_m / METROS_POR_GRAU if snap_tolerance_m > 0 else 0.0
+
+    for feat in iter_features(path, chunk_size, progress):
+        points = feature_points(feat)
+        if not points:
+            continue
+
+        street = (feat.get('properties') or {}).get('name', '')
+
+        # Converte cada ponto em id inteiro, criando o nó na primeira ocorrência
+        ids = []
+        for p in points:
+            lon, lat = p[0], p[1]
+            key = (round(lon / cell), round(lat / cell)) if cell else (lon, lat)
+            nid = node_ids.get(key)
+            if nid is None:
+                nid = node_ids[key] = len(node_ids)
+                graph.add_node(nid, lon, lat)
+            ids.append(nid)
+
+        lons = [p[0] for p in points]
+        lats = [p[1] for p in points]
+        for u, v, w in zip(ids, ids[1:], segment_lengths(lons, lats)):
+            if u != v:
+                graph.add_edge(u, v, w, street)
+
+    graph.components = Components.from_graph(graph)
+    if largest_only and graph.components.count > 1:
+        graph = largest_component(graph, graph.components)
+    return graph
@@ -0,0 +1,115 @@
+import argparse
+import asyncio
+import json
+import random
+import time
+from typing import List, Optional, Tuple
+
+async def _request(reader: asyncio.StreamReader, writer: asyncio.StreamWriter, host: str,
+                   method: str, path: str, payload: Optional[dict] = None) -> Tuple[int, dict]:
+    """
+    Envia uma requisição HTTP/1.1 em uma conexão persistente e lê a resposta JSON.
+    """
+    body = json.dumps(payload).encode('utf-8') if payload is not None else b''
+    writer.write((f"{method} {path} HTTP/1.1\r\nHost: {host}\r\n"
+                  f"Content-Type: application/json\r\nContent-Length: {len(body)}\r\n\r\n").encode('latin-1') + body)
+    await writer.drain()
+
+    status = int((await reader.readline()).split()[1])
+    length = 0
+    while True:
+        line = await reader.readline()
+        if line in (b'\r\n', b'\n', b''):
+            break
+        name, _, value = line.decode('latin-1').partition(':')
+        if name.strip().lower() == 'content-length':
+            length = int(value)
+    return status, json.loads(await reader.readexactly(length))
+
+def percentile(values: List[float], p: float) -> float:
+    """
+    Percentil p (0 a 100) pelo método do posto mais próximo; values deve estar ordenada.
+    """
+    if not values:
+        return 0.0
+    k = max(0, min(len(values) - 1, round(p / 100 * len(values) + 0.5) - 1))
+    return values[k]
+
+async def run(host: str = '127.0.0.1', port: int = 8080, num_requests: int = 500, concurrency: int = 8,
+              batch: int = 1, method: str = 'A', two: bool = False, seed: int = 42) -> dict:
+    """
+    Dispara num_requests requisições contra um servidor local (server.py) com concurrency conexões
+    simultâneas e mede a vazão e a latência. Os pontos são sorteados com semente fixa dentro dos
+    limites do mapa informados por /health. Com batch > 1, cada requisição é um lote em /batch.
+    """
+    reader, writer = await asyncio.open_connection(host, port)
+    _, health = await _request(reader, writer, host, 'GET', '/health')
+    writer.close()
+    min_lat, min_lon, max_lat, max_lon = health['bounds']
+
+    rng = random.Random(seed)
+
+    def point():
+        return [rng.uniform(min_lat, max_lat), rng.uniform(min_lon, max_lon)]
+
+    def query():
+        return {'from': point(), 'to': point(), 'method': method, 'two': two}
+
+    if batch > 1:
+        requests = [('/batch', {'queries': [query() for _ in range(batch)]}) for _ in range(num_requests)]
+    else:
+        requests = [('/route', query()) for _ in range(num_requests)]
+
+    latencies: List[float] = []
+    errors = 0
+    pending = iter(requests)
+
+    async def client():
+        nonlocal errors
+        reader, writer = await asyncio.open_connection(host, port)
+        try:
+            for path, payload in pending:
+                t0 = time.perf_counter()
+                status, _ = await _request(reader, writer, host, 'POST', path, payload)
+                latencies.append((time.perf_counter() - t0) * 1000)
+                if status != 200:
+                    errors += 1
+        finally:
+            writer.close()
+
+    t0 = time.perf_counter()
+    await asyncio.gather(*(client() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - t0
+
+    latencies.sort()
+    return {
+        'requests': len(latencies),
+        'errors': errors,
+        'seconds': elapsed,
+        'requests_per_s': len(latencies) / elapsed,
+        'routes_per_s': len(latencies) * batch / elapsed,
+        'p50_ms': percentile(latencies, 50),
+        'p99_ms': percentile(latencies, 99),
+        'max_ms': latencies[-1] if latencies else 0.0,
+    }
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description="Teste de carga do serviço de rotas (server.py)")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8080)
+    parser.add_argument('-n', '--requests', type=int, default=500, help="número de requisições")
+    parser.add_argument('-c', '--concurrency', type=int, default=8, help="conexões simultâneas")
+    parser.add_argument('--batch', type=int, default=1, help="consultas por requisição (usa /batch se > 1)")
+    parser.add_argument('--method', default='A')
+    parser.add_argument('--two', action='store_true', help="pede os dois menores caminhos")
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args(argv)
+
+    r = asyncio.run(run(args.host, args.port, args.requests, args.concurrency, args.batch,
+                        args.method, args.two, args.seed))
+    print(f"{r['requests']} requisições em {r['seconds']:.2f} s ({r['errors']} erros)")
+    print(f"Vazão: {r['requests_per_s']:.1f} req/s ({r['routes_per_s']:.1f} rotas/s)")
+    print(f"Latência: p50 {r['p50_ms']:.2f} ms, p99 {r['p99_ms']:.2f} ms, máx {r['max_ms']:.2f} ms")
+
+if __name__ == '__main__':
+    main()
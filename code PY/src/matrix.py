@@ -0,0 +1,84 @@
+import math
+import os
+from array import array
+from concurrent.futures import ProcessPoolExecutor
+from typing import List, Optional, Sequence, Union
+from cache import load_cache
+from compact import CompactGraph
+from graph import Graph, NodeId
+
+# Quantidade de origens enviadas a cada tarefa do pool de processos
+CHUNK_ORIGINS = 16
+
+# Grafo usado pelos processos trabalhadores (definido em _init_worker)
+_worker_graph: Optional[CompactGraph] = None
+
+def _init_worker(source: Union[CompactGraph, str]):
+    """
+    Inicializa um processo trabalhador. Recebe o grafo compacto ou o caminho de um
+    cache binário; no segundo caso o cache é mapeado em memória e as páginas ficam
+    compartilhadas entre todos os processos.
+    """
+    global _worker_graph
+    if isinstance(source, str):
+        _worker_graph = load_cache(source)
+        if _worker_graph is None:
+            raise RuntimeError(f"Cache binário inválido ou de outra versão: {source}")
+    else:
+        _worker_graph = source
+
+def _same_graph(a: CompactGraph, b: CompactGraph) -> bool:
+    """
+    Indica se os dois grafos compactos têm os mesmos nós (ids, na mesma ordem) e as mesmas
+    arestas com os mesmos pesos, isto é, se os índices de um valem no outro.
+    """
+    return (a.num_nodes == b.num_nodes and len(a.targets) == len(b.targets) and
+            list(a.ids) == list(b.ids) and
+            memoryview(a.offsets) == memoryview(b.offsets) and
+            memoryview(a.targets) == memoryview(b.targets) and
+            memoryview(a.weights) == memoryview(b.weights))
+
+def _rows(graph: CompactGraph, origins: Sequence[int], dests: Sequence[int]) -> List[array]:
+    """
+    Calcula as linhas da matriz para um bloco de origens: uma busca por origem,
+    lendo as distâncias de todos os destinos.
+    """
+    targets = set(dests)
+    rows = []
+    for s in origins:
+        dist = graph._distances_idx(s, targets)
+        rows.append(array('d', (dist.get(t, math.inf) for t in dests)))
+    return rows
+
+def _worker_rows(origins: Sequence[int], dests: Sequence[int]) -> List[array]:
+    return _rows(_worker_graph, origins, dests)
+
+def distance_matrix(graph: Union[Graph, CompactGraph], origins: Sequence[NodeId], destinations: Sequence[NodeId],
+                    workers: Optional[int] = None, cache_path: Optional[str] = None) -> List[array]:
+    """
+    Matriz de distâncias origem x destino (em metros; math.inf quando não há caminho).
+    Cada origem executa um único Dijkstra, interrompido quando todos os destinos foram fixados.
+    Com workers > 1, as origens são divididas em blocos entre processos que compartilham
+    o mesmo grafo somente leitura: herdado do processo pai ou, se cache_path for informado,
+    mapeado do cache binário. O cache só é usado se contiver exatamente o mesmo grafo (nós,
+    arestas e pesos atuais); caso contrário, os processos recebem uma cópia do grafo. Retorna uma lista de linhas (array de floats), que pode ser
+    convertida diretamente em numpy.array quando o NumPy estiver disponível.
+    """
+    compact = graph if isinstance(graph, CompactGraph) else CompactGraph.from_graph(graph)
+    origin_idx = [compact.index[nid] for nid in origins]
+    dest_idx = [compact.index[nid] for nid in destinations]
+
+    workers = workers or os.cpu_count() or 1
+    if workers <= 1 or len(origin_idx) <= CHUNK_ORIGINS:
+        return _rows(compact, origin_idx, dest_idx)
+
+    source: Union[CompactGraph, str] = compact
+    if cache_path is not None:
+        cached = load_cache(cache_path)
+        if cached is not None and _same_graph(cached, compact):
+            source = cache_path
+
+    chunks = [origin_idx[i:i + CHUNK_ORIGINS] for i in range(0, len(origin_idx), CHUNK_ORIGINS)]
+    with ProcessPoolExecutor(workers, initializer=_init_worker, initargs=(source,)) as pool:
+        results = pool.map(_worker_rows, chunks, [dest_idx] * len(chunks))
+        return [row for rows in results for row in rows]
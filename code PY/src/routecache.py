@@ -0,0 +1,214 @@
+import math
+from collections import OrderedDict
+from typing import Callable, Dict, Hashable, List, NamedTuple, Optional, Set, Tuple
+
+# Tamanhos padrão: rotas guardadas e árvores de menores caminhos (uma por origem)
+MAX_ROUTES = 1024
+MAX_TREES = 8
+
+# Consultas sem acerto a partir da mesma origem antes de calcular sua árvore completa
+TREE_AFTER_MISSES = 2
+
+# Acima desta quantidade de reduções de peso em um lote, as rotas são todas descartadas
+# em vez de testadas uma a uma
+DECREASE_CLEAR_LIMIT = 32
+
+class CacheInfo(NamedTuple):
+    """
+    Contadores do cache de rotas e das árvores por origem.
+    """
+    hits: int
+    misses: int
+    evictions: int
+    size: int
+    maxsize: int
+    tree_hits: int
+    tree_misses: int
+    tree_evictions: int
+    trees: int
+    max_trees: int
+    invalidations: int
+
+class _LRU:
+    """
+    Dicionário limitado com descarte do item usado há mais tempo.
+    """
+    def __init__(self, maxsize: int):
+        self.maxsize = maxsize
+        self.data: 'OrderedDict[Hashable, object]' = OrderedDict()
+        self.evictions = 0
+
+    def get(self, key: Hashable):
+        value = self.data.get(key)
+        if value is not None:
+            self.data.move_to_end(key)
+        return value
+
+    def put(self, key: Hashable, value) -> List[Tuple[Hashable, object]]:
+        """
+        Insere o item e retorna os itens descartados para abrir espaço.
+        """
+        self.data[key] = value
+        self.data.move_to_end(key)
+        evicted = []
+        while len(self.data) > self.maxsize:
+            evicted.append(self.data.popitem(last=False))
+            self.evictions += 1
+        return evicted
+
+class RouteCache:
+    """
+    Memoização opcional das consultas de um Graph (ativada com graph.route_cache = RouteCache()).
+    Guarda as rotas por (origem, destino, método) e, para origens consultadas repetidamente,
+    a árvore completa de menores caminhos de um único Dijkstra, da qual saem as rotas para
+    qualquer destino. Ambos têm tamanho limitado e descarte LRU.
+    O cache guarda a versão do grafo em que foi preenchido e se esvazia sozinho quando
+    add_node/add_edge alteram o grafo. Alterações de peso (Graph.update_edges) descartam
+    apenas o que foi afetado (ver edges_changed).
+    """
+    def __init__(self, maxsize: int = MAX_ROUTES, max_trees: int = MAX_TREES,
+                 tree_after_misses: int = TREE_AFTER_MISSES):
+        self.routes = _LRU(maxsize)
+        self.trees = _LRU(max_trees)
+        self.tree_after_misses = tree_after_misses
+        self._origin_misses = _LRU(maxsize)
+        self._by_edge: Dict[Tuple[Hashable, Hashable], Set[Hashable]] = {}  # (u, v) -> chaves das rotas que a usam
+        self.version = None
+        self.hits = self.misses = 0
+        self.tree_hits = self.tree_misses = 0
+        self.invalidations = 0
+
+    def sync(self, version: int):
+        """
+        Descarta o conteúdo se o grafo mudou desde o último acesso (os contadores são mantidos).
+        """
+        if version != self.version:
+            self.version = version
+            self.routes.data.clear()
+            self.trees.data.clear()
+            self._origin_misses.data.clear()
+            self._by_edge.clear()
+
+    def get_route(self, key: Hashable):
+        entry = self.routes.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return entry[0]
+
+    def put_route(self, key: Hashable, route):
+        # Guarda também a distância total (infinita quando não há caminho), usada em edges_changed
+        length = sum(w for _, _, w, _ in route) if route or key[0] == key[1] else math.inf
+        for old_key, (old_route, _) in self.routes.put(key, (route, length)):
+            self._unindex(old_key, old_route)
+        for u, v, _, _ in route:
+            self._by_edge.setdefault((u.id, v.id), set()).add(key)
+
+    def _unindex(self, key: Hashable, route):
+        for u, v, _, _ in route:
+            keys = self._by_edge.get((u.id, v.id))
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._by_edge[(u.id, v.id)]
+
+    def _drop_route(self, key: Hashable):
+        entry = self.routes.data.pop(key, None)
+        if entry is not None:
+            self._unindex(key, entry[0])
+            self.invalidations += 1
+
+    def edges_changed(self, changes: List[Tuple[Hashable, Hashable, float, float]],
+                      propagate: Callable, straight: Callable[[Hashable, Hashable], float]):
+        """
+        Repara o cache após alterações de peso (u, v, peso antigo, peso novo).
+        - Aumento: descarta as rotas que passam pela aresta e as árvores em que ela é aresta da árvore
+          (as demais continuam exatas, pois nenhuma distância diminui).
+        - Redução: corrige as árvores com propagate (só os nós cuja distância diminui) e descarta
+          as rotas que poderiam ficar mais curtas passando pela aresta, usando a distância em
+          linha reta (straight) como limite inferior dos trechos até ela e a partir dela.
+        """
+        increased = [(u, v, old) for u, v, old, new in changes if new > old]
+        decreased = [(u, v, new) for u, v, old, new in changes if new < old]
+
+        for start_id, (dist, prev) in list(self.trees.data.items()):
+            if any(_in_tree(dist, prev, u, v, w) for u, v, w in increased):
+                del self.trees.data[start_id]
+                self.invalidations += 1
+            elif decreased:
+                propagate(dist, prev, decreased)
+
+        stale: Set[Hashable] = set()
+        for u, v, _ in increased:
+            stale.update(self._by_edge.get((u, v), ()))
+            stale.update(self._by_edge.get((v, u), ()))
+        if len(decreased) > DECREASE_CLEAR_LIMIT:
+            stale.update(self.routes.data)
+        elif decreased:
+            for key, (_, length) in self.routes.data.items():
+                s, t = key[0], key[1]
+                for u, v, w in decreased:
+                    if (straight(s, u) + w + straight(v, t) < length or
+                            straight(s, v) + w + straight(u, t) < length):
+                        stale.add(key)
+                        break
+        for key in stale:
+            self._drop_route(key)
+
+    def tree(self, start_id, compute: Callable[[], Tuple[Dict, Dict]]) -> Tuple[Dict, Dict]:
+        """
+        Árvore (distâncias, predecessores) a partir de start_id, calculada por compute se ausente.
+        """
+        tree = self.trees.get(start_id)
+        if tree is None:
+            self.tree_misses += 1
+            tree = compute()
+            self.trees.put(start_id, tree)
+            # Se a árvore for descartada depois, a origem precisa voltar a se repetir para ser recalculada
+            self._origin_misses.data.pop(start_id, None)
+        else:
+            self.tree_hits += 1
+        return tree
+
+    def cached_tree(self, start_id) -> Optional[Tuple[Dict, Dict]]:
+        """
+        Árvore já calculada para start_id, sem calcular uma nova.
+        """
+        tree = self.trees.get(start_id)
+        if tree is not None:
+            self.tree_hits += 1
+        return tree
+
+    def wants_tree(self, start_id) -> bool:
+        """
+        Registra uma consulta sem acerto a partir de start_id e indica se a origem já se repetiu
+        o suficiente para compensar um Dijkstra completo.
+        """
+        count = (self._origin_misses.get(start_id) or 0) + 1
+        self._origin_misses.put(start_id, count)
+        return count >= self.tree_after_misses
+
+    def info(self) -> CacheInfo:
+        return CacheInfo(self.hits, self.misses, self.routes.evictions, len(self.routes.data), self.routes.maxsize,
+                         self.tree_hits, self.tree_misses, self.trees.evictions, len(self.trees.data),
+                         self.trees.maxsize, self.invalidations)
+
+    def clear(self):
+        """
+        Esvazia o cache e zera os contadores.
+        """
+        self.version = None
+        self.routes.data.clear()
+        self.trees.data.clear()
+        self._origin_misses.data.clear()
+        self._by_edge.clear()
+        self.hits = self.misses = self.tree_hits = self.tree_misses = self.invalidations = 0
+        self.routes.evictions = self.trees.evictions = 0
+
+def _in_tree(dist: Dict, prev: Dict, u: Hashable, v: Hashable, w: float) -> bool:
+    """
+    Indica se a aresta u-v de peso w é usada pela árvore (dist, prev) em algum dos sentidos.
+    """
+    return ((prev.get(v) == u and dist.get(v) == dist.get(u, math.inf) + w) or
+            (prev.get(u) == v and dist.get(u) == dist.get(v, math.inf) + w))
@@ -0,0 +1,278 @@
+import argparse
+import asyncio
+import json
+import math
+import os
+from concurrent.futures import ProcessPoolExecutor
+from typing import List, Optional, Tuple, Union
+from urllib.parse import urlsplit
+from cache import CACHE_EXT, load_cache, load_graph_cached
+from compact import CompactGraph
+from spatial import SpatialIndex
+from stats import SearchStats
+
+# Métodos aceitos pelo serviço (os mesmos do grafo compacto)
+METHODS = ('D', 'DP', 'DB', 'A')
+
+# Quantidade de consultas de um lote enviadas a cada tarefa do pool de processos
+BATCH_CHUNK = 32
+
+# Tamanho máximo aceito para o corpo de uma requisição
+MAX_BODY = 1 << 20
+
+# Folga, em graus (cerca de 1 km), em torno dos limites do mapa para os pontos de uma consulta
+BOUNDS_MARGIN = 0.01
+
+_REASONS = {200: 'OK', 400: 'Bad Request', 404: 'Not Found', 405: 'Method Not Allowed',
+            413: 'Payload Too Large', 500: 'Internal Server Error'}
+
+# Grafo usado pelos processos trabalhadores (definido em _init_worker)
+_worker_graph: Optional[CompactGraph] = None
+
+class BadRequest(Exception):
+    """
+    Requisição inválida; a mensagem é devolvida ao cliente com status 400.
+    """
+
+def _init_worker(source: Union[CompactGraph, str], snap_tolerance_m: float = 0.0, largest_only: bool = False):
+    """
+    Inicializa um processo trabalhador com o grafo compacto ou com o cache binário mapeado em memória
+    (gravado com a tolerância de agrupamento e a opção largest_only informadas).
+    """
+    global _worker_graph
+    if isinstance(source, str):
+        _worker_graph = load_cache(source, snap_tolerance_m=snap_tolerance_m, largest_only=largest_only)
+    else:
+        _worker_graph = source
+
+def _describe(path) -> dict:
+    """
+    Converte um caminho (lista de segmentos) em um dicionário serializável em JSON.
+    """
+    ruas = list(dict.fromkeys(name for _, _, _, name in path if name))
+    coords = [[path[0][0].y, path[0][0].x]] if path else []
+    coords += [[v.y, v.x] for _, v, _, _ in path]
+    return {
+        'distance_m': sum(w for _, _, w, _ in path),
+        'streets': ruas,
+        'nodes': [path[0][0].id] + [v.id for _, v, _, _ in path] if path else [],
+        'coordinates': coords,
+    }
+
+def _route(graph: CompactGraph, start_id, end_id, method: str, two: bool, with_stats: bool) -> dict:
+    """
+    Executa uma consulta e devolve os caminhos encontrados (um ou dois) e,
+    se pedido, as estatísticas da busca.
+    """
+    result = {}
+    if with_stats:
+        if two:
+            *paths, stats = graph.shortest_two_paths_with_stats(start_id, end_id, method)
+        else:
+            path, stats = graph.shortest_path_with_stats(start_id, end_id, method)
+            paths = [path]
+        result['stats'] = stats.as_dict()
+    elif two:
+        paths = graph.shortest_two_paths(start_id, end_id, method)
+    else:
+        paths = [graph.shortest_path(start_id, end_id, method)]
+    result['paths'] = [_describe(p) for p in paths]
+    return result
+
+def _worker_routes(queries: List[Tuple[int, int, str, bool, bool]]) -> List[dict]:
+    return [_route(_worker_graph, *query) for query in queries]
+
+class RoutingService:
+    """
+    Serviço HTTP de rotas: carrega o mapa uma única vez e responde consultas com pares lat/lon.
+    As requisições são tratadas com asyncio; a associação do ponto ao nó mais próximo é feita
+    no processo principal (índice espacial) e as buscas rodam em um pool de processos que
+    compartilham o cache binário do mapa. No máximo max_concurrency tarefas de busca ficam
+    em execução ao mesmo tempo; as demais aguardam sem ocupar o pool.
+
+    Rotas:
+    - GET  /health: número de nós, arestas e componentes conexos e limites [lat_min, lon_min, lat_max, lon_max] do mapa;
+    - GET  /stats: estatísticas acumuladas das consultas feitas com "stats": true;
+    - POST /route: {"from": [lat, lon], "to": [lat, lon], "method": "A", "two": false, "stats": false};
+    - POST /batch: {"queries": [consulta, ...]}, respondido na mesma ordem.
+    """
+    def __init__(self, map_path: str, workers: Optional[int] = None, max_concurrency: Optional[int] = None,
+                 snap_tolerance_m: float = 0.0, largest_only: bool = False):
+        self.graph = load_graph_cached(map_path, snap_tolerance_m=snap_tolerance_m, largest_only=largest_only)
+        self.spatial = SpatialIndex(self.graph.to_graph())
+        ys, xs = self.graph.ys, self.graph.xs
+        self.bounds = [min(ys), min(xs), max(ys), max(xs)] if len(xs) else []
+        self.workers = workers or os.cpu_count() or 1
+        self.max_concurrency = max_concurrency or 2 * self.workers
+
+        # Os trabalhadores mapeiam o cache quando ele existe; caso contrário recebem uma cópia do grafo
+        cache_path = map_path + CACHE_EXT
+        cached = load_cache(cache_path, map_path, snap_tolerance_m, verify_hash=False, largest_only=largest_only)
+        source = cache_path if cached else self.graph
+        self.pool = ProcessPoolExecutor(self.workers, initializer=_init_worker,
+                                        initargs=(source, snap_tolerance_m, largest_only))
+        self._limit: Optional[asyncio.Semaphore] = None
+        self.stats = SearchStats()
+
+    def _parse_query(self, query) -> Tuple[int, int, str, bool, bool]:
+        """
+        Valida uma consulta e associa as coordenadas aos nós mais próximos.
+        Pontos fora dos limites do mapa (com folga de BOUNDS_MARGIN) são recusados, o que
+        mantém curta a busca no índice espacial, feita no próprio laço de eventos.
+        """
+        if not isinstance(query, dict):
+            raise BadRequest("Consulta deve ser um objeto JSON")
+        method = str(query.get('method', 'A')).upper()
+        if method not in METHODS:
+            raise BadRequest(f"Método desconhecido: {method}")
+        ids = []
+        for key in ('from', 'to'):
+            try:
+                lat, lon = (float(c) for c in query[key])
+            except (KeyError, TypeError, ValueError):
+                raise BadRequest(f"Campo '{key}' deve ser [lat, lon]")
+            if not (math.isfinite(lat) and math.isfinite(lon)):
+                raise BadRequest(f"Campo '{key}' deve ter coordenadas finitas")
+            if not self.bounds:
+                raise BadRequest("Mapa vazio")
+            min_lat, min_lon, max_lat, max_lon = self.bounds
+            if not (min_lat - BOUNDS_MARGIN <= lat <= max_lat + BOUNDS_MARGIN and
+                    min_lon - BOUNDS_MARGIN <= lon <= max_lon + BOUNDS_MARGIN):
+                raise BadRequest(f"Ponto '{key}' fora dos limites do mapa")
+            ids.append(self.spatial.nearest_node(lat, lon))
+        return ids[0], ids[1], method, bool(query.get('two', False)), bool(query.get('stats', False))
+
+    async def _run(self, queries: List[Tuple[int, int, str, bool, bool]]) -> List[dict]:
+        """
+        Envia as consultas ao pool em blocos de BATCH_CHUNK, respeitando o limite de concorrência.
+        """
+        loop = asyncio.get_running_loop()
+
+        async def chunk(part):
+            async with self._limit:
+                return await loop.run_in_executor(self.pool, _worker_routes, part)
+
+        parts = [queries[i:i + BATCH_CHUNK] for i in range(0, len(queries), BATCH_CHUNK)]
+        results = [result for part in await asyncio.gather(*(chunk(p) for p in parts)) for result in part]
+        for result in results:
+            if 'stats' in result:
+                self.stats.add(SearchStats.from_dict(result['stats']))
+        return results
+
+    async def handle(self, method: str, target: str, body: bytes) -> Tuple[int, dict]:
+        """
+        Trata uma requisição já lida e devolve (status, corpo da resposta).
+        """
+        path = urlsplit(target).path
+        if path == '/health':
+            return 200, {'nodes': self.graph.num_nodes, 'edges': self.graph.num_edges,
+                         'components': self.graph.components.count, 'bounds': self.bounds}
+        if path == '/stats':
+            return 200, self.stats.as_dict()
+        if path not in ('/route', '/batch'):
+            return 404, {'error': "Rota não encontrada"}
+        if method != 'POST':
+            return 405, {'error': "Use POST"}
+
+        try:
+            payload = json.loads(body or b'{}')
+            if path == '/route':
+                (result,) = await self._run([self._parse_query(payload)])
+                return 200, result
+            queries = payload.get('queries') if isinstance(payload, dict) else None
+            if not isinstance(queries, list):
+                raise BadRequest("Campo 'queries' deve ser uma lista")
+            results = await self._run([self._parse_query(q) for q in queries])
+            return 200, {'results': results}
+        except (BadRequest, ValueError) as e:
+            return 400, {'error': str(e)}
+
+    async def _serve_client(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        """
+        Lê requisições HTTP/1.1 de uma conexão (com keep-alive) e escreve as respostas.
+        """
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line:
+                    break
+                try:
+                    method, target, version = request_line.decode('latin-1').split()
+                except ValueError:
+                    break
+
+                headers = {}
+                while True:
+                    line = await reader.readline()
+                    if line in (b'\r\n', b'\n', b''):
+                        break
+                    name, _, value = line.decode('latin-1').partition(':')
+                    headers[name.strip().lower()] = value.strip()
+
+                try:
+                    length = int(headers.get('content-length', 0) or 0)
+                except ValueError:
+                    length = -1
+                if length < 0:
+                    status, response = 400, {'error': "Content-Length inválido"}
+                    keep_alive = False
+                elif length > MAX_BODY:
+                    status, response = 413, {'error': "Corpo muito grande"}
+                    keep_alive = False
+                else:
+                    body = await reader.readexactly(length) if length else b''
+                    try:
+                        status, response = await self.handle(method.upper(), target, body)
+                    except Exception as e:
+                        status, response = 500, {'error': str(e)}
+                    connection = headers.get('connection', '').lower()
+                    keep_alive = connection != 'close' and (version == 'HTTP/1.1' or connection == 'keep-alive')
+
+                data = json.dumps(response, ensure_ascii=False).encode('utf-8')
+                writer.write((f"HTTP/1.1 {status} {_REASONS[status]}\r\n"
+                              f"Content-Type: application/json; charset=utf-8\r\n"
+                              f"Content-Length: {len(data)}\r\n"
+                              f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n").encode('latin-1') + data)
+                await writer.drain()
+                if not keep_alive:
+                    break
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            writer.close()
+
+    async def serve(self, host: str = '127.0.0.1', port: int = 8080):
+        """
+        Inicia o servidor e atende conexões até ser interrompido.
+        """
+        self._limit = asyncio.Semaphore(self.max_concurrency)
+        server = await asyncio.start_server(self._serve_client, host, port)
+        print(f"Servindo {self.graph.num_nodes} nós em http://{host}:{port} "
+              f"({self.workers} processos, até {self.max_concurrency} buscas simultâneas)")
+        try:
+            async with server:
+                await server.serve_forever()
+        finally:
+            self.pool.shutdown(cancel_futures=True)
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description="Serviço HTTP de rotas sobre um mapa GeoJSON")
+    parser.add_argument('mapa', help="arquivo GeoJSON")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8080)
+    parser.add_argument('--workers', type=int, default=None, help="processos de busca (padrão: nº de CPUs)")
+    parser.add_argument('--max-concurrency', type=int, default=None,
+                        help="buscas simultâneas no pool (padrão: 2x o nº de processos)")
+    parser.add_argument('--snap', type=float, default=0.0, help="tolerância de agrupamento de pontos, em metros")
+    parser.add_argument('--largest-component', action='store_true',
+                        help="carrega apenas o maior componente conexo do mapa")
+    args = parser.parse_args(argv)
+
+    service = RoutingService(args.mapa, args.workers, args.max_concurrency, args.snap, args.largest_component)
+    try:
+        asyncio.run(service.serve(args.host, args.port))
+    except KeyboardInterrupt:
+        pass
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,290 @@
+import argparse
+import math
+import random
+import time
+from array import array
+from typing import Callable, Dict, Iterable, List, Optional, Sequence, Set, Tuple
+from graph import ExcludedEdges, Graph, Node, NodeId
+
+# Peça de cadeia criada para uma consulta: (peso, índice da cadeia, posição inicial, posição final)
+Piece = Tuple[float, int, int, int]
+
+def _is_shape_point(node: Node) -> bool:
+    """
+    Indica se o nó é apenas um ponto de forma: exatamente duas arestas, para vizinhos distintos
+    (e diferentes dele mesmo), ambas com o mesmo nome de rua.
+    """
+    if len(node.edges) != 2:
+        return False
+    (a, _, name_a), (b, _, name_b) = node.edges
+    return a is not b and a is not node and b is not node and name_a == name_b
+
+class SimplifiedGraph:
+    """
+    Grafo reduzido em que as cadeias de nós de grau 2 (pontos de forma das linhas do GeoJSON)
+    são substituídas por uma única aresta, com peso igual à soma dos trechos.
+    Cada cadeia guarda a sequência original de nós (a geometria) e os ids das arestas originais,
+    e a aresta correspondente no grafo reduzido (self.core) tem o mesmo índice da cadeia e o
+    nome da rua. Ativado com graph.simplified = SimplifiedGraph.build(graph): as buscas de
+    shortest_path passam a rodar no grafo reduzido e o caminho é expandido de volta nas arestas
+    originais. Origens e destinos no meio de uma cadeia entram na busca como nós temporários,
+    ligados às pontas da cadeia em uma cópia do dicionário de nós (o grafo reduzido não é alterado).
+    """
+    def __init__(self, graph: Graph, core: Graph, chain_nodes: List[List[NodeId]], chain_edges: List[array]):
+        self.graph = graph
+        self.core = core
+        self.chain_nodes = chain_nodes
+        self.chain_edges = chain_edges
+        # Nó interno de cadeia -> (índice da cadeia, posição na cadeia)
+        self.position: Dict[NodeId, Tuple[int, int]] = {}
+        # (ponta u, ponta v) -> cadeias que ligam u a v (nos dois sentidos)
+        self.between: Dict[Tuple[NodeId, NodeId], List[int]] = {}
+        # Id da aresta original -> índice da cadeia que a contém
+        self.chain_of_edge = array('i', [-1]) * len(graph.edge_refs)
+        for c, (seq, edge_ids) in enumerate(zip(chain_nodes, chain_edges)):
+            for pos in range(1, len(seq) - 1):
+                self.position[seq[pos]] = (c, pos)
+            self.between.setdefault((seq[0], seq[-1]), []).append(c)
+            if seq[0] != seq[-1]:
+                self.between.setdefault((seq[-1], seq[0]), []).append(c)
+            for e in edge_ids:
+                self.chain_of_edge[e] = c
+
+    @classmethod
+    def build(cls, graph: Graph) -> 'SimplifiedGraph':
+        """
+        Percorre as cadeias a partir dos nós que permanecem (cruzamentos, pontas e mudanças de
+        nome da rua). Ciclos formados apenas por pontos de forma mantêm um de seus nós.
+        """
+        # Id da aresta original de cada posição das listas de adjacência
+        slot_edge: Dict[Tuple[NodeId, int], int] = {}
+        for e, (src, i, dst, j) in enumerate(graph.edge_refs):
+            slot_edge[src.id, i] = e
+            slot_edge[dst.id, j] = e
+        interior = {nid for nid, node in graph.nodes.items() if _is_shape_point(node)}
+
+        chain_nodes: List[List[NodeId]] = []
+        chain_edges: List[array] = []
+        visited: Set[NodeId] = set()
+
+        def walk(node: Node, k: int):
+            """
+            Segue a cadeia que sai de node pela aresta k até o próximo nó que permanece.
+            """
+            seq, edge_ids = [node.id], array('i')
+            while True:
+                dest = node.edges[k][0]
+                edge_ids.append(slot_edge[node.id, k])
+                seq.append(dest.id)
+                if dest.id not in interior:
+                    break
+                visited.add(dest.id)
+                # Sai do ponto de forma pela aresta que não leva de volta
+                k = 1 if dest.edges[0][0] is node else 0
+                node = dest
+            chain_nodes.append(seq)
+            chain_edges.append(edge_ids)
+
+        for src, i, dst, _ in graph.edge_refs:
+            if src.id not in interior and dst.id not in interior:
+                walk(src, i)
+        for nid, node in graph.nodes.items():
+            if nid not in interior:
+                for k, (dest, _, _) in enumerate(node.edges):
+                    if dest.id in interior and dest.id not in visited:
+                        walk(node, k)
+        for nid in graph.nodes:
+            if nid in interior and nid not in visited:
+                # Ciclo isolado: o nó passa a permanecer e a cadeia começa e termina nele
+                interior.discard(nid)
+                walk(graph.nodes[nid], 0)
+
+        core = Graph()
+        for nid, node in graph.nodes.items():
+            if nid not in interior:
+                core.add_node(nid, node.x, node.y)
+        for seq, edge_ids in zip(chain_nodes, chain_edges):
+            core.add_edge(seq[0], seq[-1], sum(graph.edge(e)[2] for e in edge_ids), graph.edge(edge_ids[0])[3])
+        return cls(graph, core, chain_nodes, chain_edges)
+
+    def reduction(self) -> Dict[str, int]:
+        """
+        Número de nós e de arestas antes e depois da simplificação.
+        """
+        return {
+            'nodes': len(self.graph.nodes),
+            'edges': len(self.graph.edge_refs),
+            'core_nodes': len(self.core.nodes),
+            'core_edges': len(self.core.edge_refs),
+        }
+
+    def summary(self) -> str:
+        r = self.reduction()
+        nodes_pct = 100 * (1 - r['core_nodes'] / r['nodes']) if r['nodes'] else 0.0
+        edges_pct = 100 * (1 - r['core_edges'] / r['edges']) if r['edges'] else 0.0
+        return (f"Nós: {r['nodes']} -> {r['core_nodes']} (-{nodes_pct:.1f}%)  "
+                f"Arestas: {r['edges']} -> {r['core_edges']} (-{edges_pct:.1f}%)")
+
+    def geometry(self, c: int) -> List[Tuple[float, float]]:
+        """
+        Coordenadas (longitude, latitude) dos nós originais da cadeia c, da primeira à última ponta.
+        """
+        nodes = self.graph.nodes
+        return [(nodes[nid].x, nodes[nid].y) for nid in self.chain_nodes[c]]
+
+    def _weight(self, c: int, start: int = 0, end: Optional[int] = None) -> float:
+        """
+        Peso atual do trecho da cadeia c entre as posições start e end.
+        """
+        edge = self.graph.edge
+        return sum(edge(e)[2] for e in self.chain_edges[c][start:end])
+
+    def edges_changed(self, edge_ids: Iterable[int]):
+        """
+        Atualiza o peso das arestas reduzidas cujas cadeias contêm as arestas originais alteradas
+        (ver Graph.update_edges), trocando as entradas nas listas de adjacência em O(1).
+        """
+        for c in {self.chain_of_edge[e] for e in edge_ids}:
+            src, i, dst, j = self.core.edge_refs[c]
+            name = src.edges[i][2]
+            w = self._weight(c)
+            src.edges[i] = (dst, w, name)
+            dst.edges[j] = (src, w, name)
+
+    def prev_for(self, start_id: NodeId, end_id: NodeId, method: str, excluded: ExcludedEdges = frozenset(),
+                 search: Optional[Callable] = None) -> Dict[NodeId, NodeId]:
+        """
+        Executa o método no grafo reduzido e retorna os predecessores do caminho já expandido
+        nos nós originais (como em Graph._search_prev). Arestas originais excluídas excluem a
+        cadeia inteira (ou o trecho dela entre as pontas e os nós da consulta).
+        search(grafo, origem, destino, método, excluídas) substitui a busca padrão
+        (usado pela instrumentação).
+        """
+        if start_id == end_id:
+            return {}
+        core_excluded = self._core_excluded(excluded) if excluded else frozenset()
+        view, pieces = self._view((start_id, end_id), excluded)
+        if search is None:
+            prev = view._search_prev(start_id, end_id, method, core_excluded)
+        else:
+            prev = search(view, start_id, end_id, method, core_excluded)
+
+        seq = [start_id]
+        for u, v, w, _ in view._build_path(prev, end_id, core_excluded):
+            seq.extend(self._expand(u.id, v.id, w, pieces)[1:])
+        return {seq[i + 1]: seq[i] for i in range(len(seq) - 1)}
+
+    def _view(self, endpoints: Sequence[NodeId], excluded: ExcludedEdges) -> Tuple[Graph, Dict[Tuple[NodeId, NodeId], List[Piece]]]:
+        """
+        Grafo usado na consulta: o próprio grafo reduzido, ou, se algum dos nós da consulta é
+        interno a uma cadeia, uma cópia do dicionário de nós em que essa cadeia é dividida
+        nesses nós (as arestas das pontas são copiadas antes de receber os novos trechos).
+        """
+        cuts: Dict[int, Set[int]] = {}
+        for nid in endpoints:
+            pos = self.position.get(nid)
+            if pos is not None:
+                cuts.setdefault(pos[0], set()).add(pos[1])
+        if not cuts:
+            return self.core, {}
+
+        overlay: Dict[NodeId, Node] = {}
+
+        def node(nid: NodeId) -> Node:
+            n = overlay.get(nid)
+            if n is None:
+                original = self.graph.nodes[nid]
+                n = overlay[nid] = Node(nid, original.x, original.y)
+                if nid in self.core.nodes:
+                    n.edges = list(self.core.nodes[nid].edges)
+            return n
+
+        pieces: Dict[Tuple[NodeId, NodeId], List[Piece]] = {}
+        for c, positions in cuts.items():
+            seq = self.chain_nodes[c]
+            name = self.core.edge(c)[3]
+            marks = [0] + sorted(positions) + [len(seq) - 1]
+            for i, j in zip(marks, marks[1:]):
+                if excluded and any(self._excluded(e, excluded) for e in self.chain_edges[c][i:j]):
+                    continue
+                w = self._weight(c, i, j)
+                u, v = node(seq[i]), node(seq[j])
+                u.edges.append((v, w, name))
+                v.edges.append((u, w, name))
+                pieces.setdefault((u.id, v.id), []).append((w, c, i, j))
+                pieces.setdefault((v.id, u.id), []).append((w, c, j, i))
+
+        view = Graph()
+        view.nodes = dict(self.core.nodes)
+        view.nodes.update(overlay)
+        return view, pieces
+
+    def _excluded(self, e: int, excluded: ExcludedEdges) -> bool:
+        src, dst, w, _ = self.graph.edge(e)
+        return (src.id, dst.id, w) in excluded
+
+    def _core_excluded(self, excluded: ExcludedEdges) -> ExcludedEdges:
+        """
+        Traduz as arestas originais excluídas para as arestas reduzidas das cadeias que as contêm.
+        """
+        chains = set()
+        for x, y, w in excluded:
+            pos = self.position.get(x) or self.position.get(y)
+            if pos is not None:
+                chains.add(pos[0])
+                continue
+            for c in self.between.get((x, y), ()):
+                if len(self.chain_edges[c]) == 1 and self.graph.edge(self.chain_edges[c][0])[2] == w:
+                    chains.add(c)
+        result = set()
+        for c in chains:
+            src, dst, w, _ = self.core.edge(c)
+            result.add((src.id, dst.id, w))
+            result.add((dst.id, src.id, w))
+        return result
+
+    def _expand(self, u: NodeId, v: NodeId, w: float, pieces: Dict[Tuple[NodeId, NodeId], List[Piece]]) -> List[NodeId]:
+        """
+        Sequência de nós originais da aresta reduzida u-v de peso w usada pela busca.
+        """
+        for pw, c, i, j in pieces.get((u, v), ()):
+            if pw == w:
+                seq = self.chain_nodes[c]
+                return seq[i:j + 1] if i < j else seq[j:i + 1][::-1]
+        for c in self.between[u, v]:
+            if self.core.edge(c)[2] == w:
+                seq = self.chain_nodes[c]
+                return seq if seq[0] == u else seq[::-1]
+        raise KeyError((u, v, w))
+
+def main(argv: Optional[List[str]] = None):
+    # Import local: loader só é necessário na execução pela linha de comando
+    from loader import load_geojson
+
+    parser = argparse.ArgumentParser(description="Simplifica as cadeias de nós de grau 2 de um mapa")
+    parser.add_argument('mapa', help="arquivo GeoJSON")
+    parser.add_argument('-n', '--queries', type=int, default=200, help="consultas na comparação de tempo")
+    parser.add_argument('--method', default='A')
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args(argv)
+
+    graph = load_geojson(args.mapa)
+    t0 = time.perf_counter()
+    simplified = SimplifiedGraph.build(graph)
+    print(f"Simplificação em {(time.perf_counter() - t0) * 1000:.1f} ms")
+    print(simplified.summary())
+
+    rng = random.Random(args.seed)
+    ids = list(graph.nodes)
+    pairs = [(rng.choice(ids), rng.choice(ids)) for _ in range(args.queries)]
+    lengths = []
+    for label, value in (('original', None), ('simplificado', simplified)):
+        graph.simplified = value
+        t0 = time.perf_counter()
+        lengths.append([sum(w for _, _, w, _ in graph.shortest_path(s, t, args.method)) for s, t in pairs])
+        print(f"{label:>12s}: {(time.perf_counter() - t0) * 1000 / len(pairs):.3f} ms por consulta")
+    equal = all(math.isclose(a, b, rel_tol=1e-9, abs_tol=1e-6) for a, b in zip(*lengths))
+    print("Distâncias iguais" if equal else "ATENÇÃO: distâncias diferentes")
+
+if __name__ == '__main__':
+    main()
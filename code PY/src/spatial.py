@@ -0,0 +1,229 @@
+import math
+from typing import Dict, Iterable, List, NamedTuple, Optional, Tuple
+from graph import Graph, Node, NodeId, RAIO_TERRA_M
+
+# Metros por grau de latitude (e de longitude no equador)
+METROS_POR_GRAU = RAIO_TERRA_M * math.pi / 180
+
+# Quantidade média de nós desejada por célula, usada para escolher o tamanho da célula
+NODES_PER_CELL = 4
+
+class EdgePoint(NamedTuple):
+    """
+    Ponto mais próximo sobre uma aresta: a aresta (u, v, peso, nome), a fração do
+    trecho a partir de u (0 a 1), as coordenadas do ponto e a distância até ele em metros.
+    """
+    u: Node
+    v: Node
+    weight: float
+    name: str
+    fraction: float
+    lat: float
+    lon: float
+    distance: float
+
+class SpatialIndex:
+    """
+    Índice espacial em grade (buckets) sobre as coordenadas dos nós e das arestas de um Graph.
+    As coordenadas são projetadas em metros (projeção equiretangular em torno do centro do mapa)
+    e cada célula guarda os nós e os segmentos que a tocam. As buscas de vizinho mais próximo
+    expandem anéis de células a partir do ponto até que nenhum anel restante possa conter algo
+    mais próximo, visitando em média um número constante de células. Os anéis e os retângulos
+    consultados são limitados às células ocupadas, então pontos longe do mapa não percorrem
+    células vazias.
+    O índice reflete o grafo no momento da construção.
+    """
+    def __init__(self, graph: Graph, cell_size_m: Optional[float] = None):
+        self.graph = graph
+        nodes = list(graph.nodes.values())
+        if nodes:
+            self.lat0 = (min(n.y for n in nodes) + max(n.y for n in nodes)) / 2
+            self.lon0 = (min(n.x for n in nodes) + max(n.x for n in nodes)) / 2
+        else:
+            self.lat0 = self.lon0 = 0.0
+        self.kx = METROS_POR_GRAU * math.cos(math.radians(self.lat0))
+
+        points = [self._project(n.y, n.x) for n in nodes]
+        if cell_size_m is None:
+            # Célula com lado tal que haja, em média, NODES_PER_CELL nós por célula
+            if points:
+                w = max(p[0] for p in points) - min(p[0] for p in points)
+                h = max(p[1] for p in points) - min(p[1] for p in points)
+                cell_size_m = math.sqrt(max(w * h, 1.0) * NODES_PER_CELL / len(points))
+            cell_size_m = max(cell_size_m or 50.0, 1.0)
+        self.cell = cell_size_m
+
+        self.node_cells: Dict[Tuple[int, int], List[Node]] = {}
+        for node, (x, y) in zip(nodes, points):
+            self.node_cells.setdefault(self._cell(x, y), []).append(node)
+
+        # Cada aresta não direcionada entra uma vez, em todas as células do seu retângulo envolvente
+        self.edge_cells: Dict[Tuple[int, int], List[Tuple[Node, Node, float, str]]] = {}
+        order = {id(n): i for i, n in enumerate(nodes)}
+        for u, (ux, uy) in zip(nodes, points):
+            for v, w, name in u.edges:
+                if order[id(v)] < order[id(u)]:
+                    continue
+                vx, vy = self._project(v.y, v.x)
+                c0, c1 = self._cell(min(ux, vx), min(uy, vy)), self._cell(max(ux, vx), max(uy, vy))
+                # A mesma tupla em todas as células, para que edges_within reconheça repetições
+                edge = (u, v, w, name)
+                for cx in range(c0[0], c1[0] + 1):
+                    for cy in range(c0[1], c1[1] + 1):
+                        self.edge_cells.setdefault((cx, cy), []).append(edge)
+
+        # Retângulo (em células) que contém todas as células ocupadas, ou None se o grafo estiver vazio
+        cells = list(self.node_cells) + list(self.edge_cells)
+        if cells:
+            self.cell_bounds: Optional[Tuple[int, int, int, int]] = (
+                min(cx for cx, _ in cells), min(cy for _, cy in cells),
+                max(cx for cx, _ in cells), max(cy for _, cy in cells))
+        else:
+            self.cell_bounds = None
+
+    def _project(self, lat: float, lon: float) -> Tuple[float, float]:
+        """
+        Converte (lat, lon) em metros relativos ao centro do mapa.
+        """
+        return (lon - self.lon0) * self.kx, (lat - self.lat0) * METROS_POR_GRAU
+
+    def _unproject(self, x: float, y: float) -> Tuple[float, float]:
+        """
+        Converte metros relativos ao centro de volta em (lat, lon).
+        """
+        return self.lat0 + y / METROS_POR_GRAU, self.lon0 + x / self.kx
+
+    def _cell(self, x: float, y: float) -> Tuple[int, int]:
+        return math.floor(x / self.cell), math.floor(y / self.cell)
+
+    def _ring(self, c: Tuple[int, int], r: int) -> Iterable[Tuple[int, int]]:
+        """
+        Células na borda do quadrado de raio r (em células) ao redor de c, restritas a cell_bounds.
+        """
+        x0, y0, x1, y1 = self.cell_bounds
+        cx, cy = c
+        if r == 0:
+            if x0 <= cx <= x1 and y0 <= cy <= y1:
+                yield c
+            return
+        xs = range(max(cx - r, x0), min(cx + r, x1) + 1)
+        for y in (cy - r, cy + r):
+            if y0 <= y <= y1:
+                for x in xs:
+                    yield x, y
+        ys = range(max(cy - r + 1, y0), min(cy + r - 1, y1) + 1)
+        for x in (cx - r, cx + r):
+            if x0 <= x <= x1:
+                for y in ys:
+                    yield x, y
+
+    def _ring_range(self, c: Tuple[int, int]) -> Tuple[range, int]:
+        """
+        Raios (em células) a partir de c que alcançam cell_bounds: da distância de Chebyshev até o
+        retângulo (anéis menores estão vazios) até a distância ao canto mais afastado.
+        Retorna também g², em que g é o afastamento mínimo (em células) de c até o retângulo
+        garantido nos dois eixos: qualquer célula fora do anel r está a pelo menos
+        sqrt(r² + g²) células do ponto, o que encerra cedo as buscas de pontos fora do mapa.
+        """
+        if self.cell_bounds is None:
+            return range(0), 0
+        x0, y0, x1, y1 = self.cell_bounds
+        cx, cy = c
+        gx, gy = max(x0 - cx, cx - x1, 0), max(y0 - cy, cy - y1, 0)
+        r_max = max(abs(cx - x0), abs(cx - x1), abs(cy - y0), abs(cy - y1))
+        return range(max(gx, gy), r_max + 1), max(min(gx, gy) - 1, 0) ** 2
+
+    def _clamped_cells(self, min_lat: float, min_lon: float, max_lat: float,
+                       max_lon: float) -> Tuple[range, range]:
+        """
+        Intervalos de células (x, y) do retângulo geográfico, limitados a cell_bounds.
+        """
+        if self.cell_bounds is None:
+            return range(0), range(0)
+        x0, y0 = self._cell(*self._project(min_lat, min_lon))
+        x1, y1 = self._cell(*self._project(max_lat, max_lon))
+        bx0, by0, bx1, by1 = self.cell_bounds
+        return range(max(x0, bx0), min(x1, bx1) + 1), range(max(y0, by0), min(y1, by1) + 1)
+
+    def nearest_node(self, lat: float, lon: float) -> Optional[NodeId]:
+        """
+        Retorna o id do nó mais próximo da coordenada, ou None se o grafo estiver vazio.
+        """
+        x, y = self._project(lat, lon)
+        c = self._cell(x, y)
+        best, best_d2 = None, math.inf
+        rings, g2 = self._ring_range(c)
+        for r in rings:
+            for cell in self._ring(c, r):
+                for node in self.node_cells.get(cell, ()):
+                    nx, ny = self._project(node.y, node.x)
+                    d2 = (nx - x) ** 2 + (ny - y) ** 2
+                    if d2 < best_d2:
+                        best, best_d2 = node.id, d2
+            # Qualquer nó fora dos anéis já vistos está a mais de sqrt(r² + g²) células de distância
+            if best is not None and best_d2 <= (r * r + g2) * self.cell ** 2:
+                break
+        return best
+
+    def nearest_nodes(self, points: Iterable[Tuple[float, float]]) -> List[Optional[NodeId]]:
+        """
+        Versão em lote de nearest_node para uma sequência de (lat, lon).
+        """
+        return [self.nearest_node(lat, lon) for lat, lon in points]
+
+    def nodes_within(self, min_lat: float, min_lon: float, max_lat: float, max_lon: float) -> List[NodeId]:
+        """
+        Ids dos nós dentro do retângulo geográfico informado.
+        """
+        xs, ys = self._clamped_cells(min_lat, min_lon, max_lat, max_lon)
+        found = []
+        for cx in xs:
+            for cy in ys:
+                for node in self.node_cells.get((cx, cy), ()):
+                    if min_lat <= node.y <= max_lat and min_lon <= node.x <= max_lon:
+                        found.append(node.id)
+        return found
+
+    def edges_within(self, min_lat: float, min_lon: float, max_lat: float, max_lon: float) -> List[Tuple[Node, Node, float, str]]:
+        """
+        Arestas (cada uma uma única vez) cujo retângulo envolvente toca as células do retângulo informado.
+        """
+        xs, ys = self._clamped_cells(min_lat, min_lon, max_lat, max_lon)
+        seen, found = set(), []
+        for cx in xs:
+            for cy in ys:
+                for edge in self.edge_cells.get((cx, cy), ()):
+                    if id(edge) not in seen:
+                        seen.add(id(edge))
+                        found.append(edge)
+        return found
+
+    def nearest_edge_point(self, lat: float, lon: float) -> Optional[EdgePoint]:
+        """
+        Projeta a coordenada no trecho de rua mais próximo e retorna o ponto encontrado.
+        """
+        x, y = self._project(lat, lon)
+        c = self._cell(x, y)
+        best: Optional[Tuple[float, tuple, float, float, float]] = None
+        rings, g2 = self._ring_range(c)
+        for r in rings:
+            for cell in self._ring(c, r):
+                for edge in self.edge_cells.get(cell, ()):
+                    u, v = edge[0], edge[1]
+                    ux, uy = self._project(u.y, u.x)
+                    vx, vy = self._project(v.y, v.x)
+                    dx, dy = vx - ux, vy - uy
+                    seg2 = dx * dx + dy * dy
+                    t = 0.0 if seg2 == 0 else min(1.0, max(0.0, ((x - ux) * dx + (y - uy) * dy) / seg2))
+                    px, py = ux + t * dx, uy + t * dy
+                    d2 = (px - x) ** 2 + (py - y) ** 2
+                    if best is None or d2 < best[0]:
+                        best = (d2, edge, t, px, py)
+            if best is not None and best[0] <= (r * r + g2) * self.cell ** 2:
+                break
+
+        if best is None:
+            return None
+        d2, (u, v, w, name), t, px, py = best
+        p_lat, p_lon = self._unproject(px, py)
+        return EdgePoint(u, v, w, name, t, p_lat, p_lon, math.sqrt(d2))
@@ -0,0 +1,106 @@
+import heapq
+import time
+from typing import Callable, Dict, List, Optional, Tuple
+
+class SearchStats:
+    """
+    Contadores de uma ou mais consultas: nós fixados, arestas examinadas a partir deles,
+    operações na fila de prioridade, chamadas da heurística e tempo de cada fase
+    (busca, heurística, que é parte da busca, e reconstrução do caminho).
+    O mesmo objeto serve para uma única consulta e para o acumulado de várias (ver add).
+    """
+    __slots__ = ('queries', 'searches', 'nodes_settled', 'edges_relaxed', 'heap_pushes', 'heap_pops',
+                 'heuristic_calls', 'search_ms', 'heuristic_ms', 'reconstruction_ms')
+
+    def __init__(self):
+        for field in self.__slots__:
+            setattr(self, field, 0)
+
+    def record(self, probe: 'Probe', search_s: float, reconstruction_s: float):
+        """
+        Soma os contadores de uma busca instrumentada. Os nós fixados são os nós distintos
+        retirados de cada fila; as arestas examinadas são as dos nós expandidos.
+        """
+        settled = set(probe.popped)
+        self.searches += 1
+        self.nodes_settled += len(settled)
+        self.edges_relaxed += sum(probe.degree(u) for _, u in settled if u != probe.stop)
+        self.heap_pushes += probe.pushes
+        self.heap_pops += len(probe.popped)
+        self.heuristic_calls += probe.heuristic_calls
+        self.search_ms += search_s * 1000
+        self.heuristic_ms += probe.heuristic_s * 1000
+        self.reconstruction_ms += reconstruction_s * 1000
+
+    def add(self, other: 'SearchStats') -> 'SearchStats':
+        """
+        Acumula os contadores de outra consulta (ou de outro acumulado) neste objeto.
+        """
+        for field in self.__slots__:
+            setattr(self, field, getattr(self, field) + getattr(other, field))
+        return self
+
+    def as_dict(self) -> Dict[str, float]:
+        return {field: getattr(self, field) for field in self.__slots__}
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, float]) -> 'SearchStats':
+        stats = cls()
+        for field in cls.__slots__:
+            setattr(stats, field, data.get(field, 0))
+        return stats
+
+    def summary(self) -> str:
+        """
+        Texto curto para exibição; com mais de uma consulta, mostra as médias por consulta.
+        """
+        n = max(self.queries, 1)
+        prefix = f"{self.queries} consultas (média por consulta)\n" if self.queries > 1 else ""
+        return (f"{prefix}Nós fixados: {self.nodes_settled / n:.0f}  Arestas: {self.edges_relaxed / n:.0f}\n"
+                f"Heap: {self.heap_pushes / n:.0f} inserções, {self.heap_pops / n:.0f} remoções\n"
+                f"Heurística: {self.heuristic_calls / n:.0f} chamadas, {self.heuristic_ms / n:.2f} ms\n"
+                f"Busca: {self.search_ms / n:.2f} ms  Reconstrução: {self.reconstruction_ms / n:.3f} ms")
+
+class Probe:
+    """
+    Ganchos passados às buscas no modo instrumentado: substituem heappush, heappop e a
+    heurística por versões que contam as chamadas. As buscas recebem essas funções como
+    argumentos com valor padrão, então sem instrumentação executam exatamente o mesmo código.
+    degree(u) dá o número de arestas do nó u na estrutura pesquisada e stop é o nó em que a
+    busca termina sem expandir (o destino nas buscas ponto a ponto), se houver.
+    """
+    __slots__ = ('pushes', 'popped', 'heuristic_calls', 'heuristic_s', 'degree', 'stop')
+
+    def __init__(self, degree: Callable[[object], int], stop=None):
+        self.pushes = 0
+        self.popped: List[Tuple[int, object]] = []  # (id da fila, nó) de cada remoção
+        self.heuristic_calls = 0
+        self.heuristic_s = 0.0
+        self.degree = degree
+        self.stop = stop
+
+    def push(self, heap: list, item: tuple):
+        self.pushes += 1
+        heapq.heappush(heap, item)
+
+    def pop(self, heap: list) -> tuple:
+        item = heapq.heappop(heap)
+        # O nó é sempre o último elemento das entradas da fila
+        self.popped.append((id(heap), item[-1]))
+        return item
+
+    def timed(self, fn: Optional[Callable]) -> Optional[Callable]:
+        """
+        Envolve uma heurística para contar suas chamadas e o tempo gasto nela.
+        """
+        if fn is None:
+            return None
+
+        def h(*args):
+            self.heuristic_calls += 1
+            t0 = time.perf_counter()
+            value = fn(*args)
+            self.heuristic_s += time.perf_counter() - t0
+            return value
+
+        return h
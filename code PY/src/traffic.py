@@ -0,0 +1,166 @@
+import argparse
+import random
+import sys
+import time
+from typing import Iterable, Iterator, List, NamedTuple, Optional, TextIO, Tuple
+from alt import Landmarks
+from graph import Graph
+from loader import load_geojson
+from routecache import RouteCache
+
+# Quantidade de eventos aplicados de uma vez com Graph.update_edges
+BATCH_SIZE = 256
+
+# Linhas inválidas listadas individualmente ao final da aplicação
+MAX_REPORTED_ERRORS = 20
+
+class ReplayResult(NamedTuple):
+    """
+    Resumo da aplicação de um arquivo de eventos.
+    """
+    events: int
+    changed: int
+    batches: int
+    seconds: float
+    errors: List[Tuple[int, str]]  # (nº da linha, motivo) dos eventos ignorados
+
+    @property
+    def events_per_s(self) -> float:
+        return self.events / self.seconds if self.seconds > 0 else 0.0
+
+def read_updates(stream: TextIO, graph: Graph,
+                 errors: Optional[List[Tuple[int, str]]] = None) -> Iterator[Tuple[int, float]]:
+    """
+    Lê eventos de trânsito de um arquivo texto, um por linha: "[horário] id_aresta valor",
+    com campos separados por espaço ou vírgula. O valor pode ser um peso absoluto (em metros
+    equivalentes), um fator sobre o peso original ("*1.5"), "off" (interdição) ou
+    "on" (volta ao peso original). Linhas vazias e iniciadas por # são ignoradas.
+    O arquivo é lido em sequência, sem ser carregado inteiro na memória.
+    Cada evento é validado (id da aresta e peso, ver Graph.check_edge_weight) antes de ser
+    entregue, então os lotes montados com eles nunca falham no meio da aplicação.
+    Eventos inválidos lançam ValueError com o número da linha; se errors for informada,
+    são registrados nela como (nº da linha, motivo) e ignorados.
+    """
+    for line_no, line in enumerate(stream, start=1):
+        line = line.strip()
+        if not line or line.startswith('#'):
+            continue
+        try:
+            yield _parse_event(line, graph)
+        except ValueError as e:
+            if errors is None:
+                raise ValueError(f"Linha {line_no}: {e}") from None
+            errors.append((line_no, str(e)))
+
+def _parse_event(line: str, graph: Graph) -> Tuple[int, float]:
+    """
+    Converte uma linha de evento em (id da aresta, peso), validando ambos.
+    """
+    fields = line.replace(',', ' ').split()
+    if len(fields) not in (2, 3):
+        raise ValueError("esperado '[horário] id_aresta valor'")
+    edge_id, value = int(fields[-2]), fields[-1].lower()
+    # Valida o id antes de consultar o peso original
+    graph.check_edge_weight(edge_id, float('inf'))
+    if value == 'off':
+        weight = float('inf')
+    elif value == 'on':
+        weight = graph.base_weights[edge_id]
+    elif value.startswith('*'):
+        weight = graph.base_weights[edge_id] * float(value[1:])
+    else:
+        weight = float(value)
+    graph.check_edge_weight(edge_id, weight)
+    return edge_id, weight
+
+def batches(items: Iterable, size: int) -> Iterator[List]:
+    """
+    Agrupa os itens em listas de até size elementos.
+    """
+    batch = []
+    for item in items:
+        batch.append(item)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+def replay(graph: Graph, stream: TextIO, batch_size: int = BATCH_SIZE) -> ReplayResult:
+    """
+    Aplica os eventos do arquivo em lotes e mede a vazão (incluindo os reparos de cache,
+    landmarks e hierarquia feitos por update_edges). Eventos inválidos são ignorados e
+    listados em errors, sem interromper o restante do arquivo.
+    """
+    events = changed = count = 0
+    errors: List[Tuple[int, str]] = []
+    t0 = time.perf_counter()
+    for batch in batches(read_updates(stream, graph, errors), batch_size):
+        changed += graph.update_edges(batch)
+        events += len(batch)
+        count += 1
+    return ReplayResult(events, changed, count, time.perf_counter() - t0, errors)
+
+def generate_events(graph: Graph, count: int, seed: int = 0) -> Iterator[str]:
+    """
+    Gera um dia sintético de eventos (horário crescente) sobre arestas sorteadas:
+    lentidões com fator entre 1 e 3, interdições e liberações.
+    """
+    rng = random.Random(seed)
+    num_edges = len(graph.edge_refs)
+    times = sorted(rng.randrange(24 * 3600) for _ in range(count))
+    for t in times:
+        edge_id = rng.randrange(num_edges)
+        r = rng.random()
+        if r < 0.1:
+            value = 'off'
+        elif r < 0.3:
+            value = 'on'
+        else:
+            value = f"*{rng.uniform(1.0, 3.0):.2f}"
+        yield f"{t // 3600:02d}:{t // 60 % 60:02d}:{t % 60:02d} {edge_id} {value}"
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description="Aplica eventos de trânsito a um mapa e mede a vazão")
+    parser.add_argument('mapa', help="arquivo GeoJSON")
+    parser.add_argument('eventos', nargs='?', help="arquivo de eventos (padrão: entrada padrão)")
+    parser.add_argument('--batch', type=int, default=BATCH_SIZE, help="eventos por lote")
+    parser.add_argument('--generate', type=int, metavar='N', help="apenas gera N eventos sintéticos na saída")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--route-cache', action='store_true', help="mede com o cache de rotas ativo e aquecido")
+    parser.add_argument('--landmarks', action='store_true', help="mede com as tabelas de landmarks calculadas")
+    args = parser.parse_args(argv)
+
+    graph = load_geojson(args.mapa)
+    if args.generate:
+        for line in generate_events(graph, args.generate, args.seed):
+            print(line)
+        return
+
+    if args.landmarks:
+        graph.landmarks = Landmarks.build(graph)
+    if args.route_cache:
+        graph.route_cache = RouteCache()
+        rng = random.Random(args.seed)
+        ids = list(graph.nodes)
+        for _ in range(200):
+            graph.shortest_path(rng.choice(ids[:8]), rng.choice(ids), 'A')
+
+    if args.eventos:
+        with open(args.eventos, 'r', encoding='utf-8') as f:
+            result = replay(graph, f, args.batch)
+    else:
+        result = replay(graph, sys.stdin, args.batch)
+
+    for line_no, reason in result.errors[:MAX_REPORTED_ERRORS]:
+        print(f"Linha {line_no} ignorada: {reason}", file=sys.stderr)
+    if len(result.errors) > MAX_REPORTED_ERRORS:
+        print(f"... e mais {len(result.errors) - MAX_REPORTED_ERRORS} linhas ignoradas", file=sys.stderr)
+    print(f"{result.events} eventos em {result.batches} lotes, {result.changed} pesos alterados, "
+          f"{len(result.errors)} eventos inválidos ignorados")
+    print(f"Tempo: {result.seconds * 1000:.1f} ms ({result.events_per_s:.0f} eventos/s)")
+    if graph.route_cache is not None:
+        print(graph.route_cache.info())
+
+if __name__ == '__main__':
+    main()
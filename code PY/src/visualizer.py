@@ -1,9 +1,28 @@
 import tkinter as tk
 from tkinter import filedialog, ttk, messagebox
-import json
-import math
 import time
-from graph import Graph, haversine_distance
+from concurrent.futures import Future, ThreadPoolExecutor
+from graph import Graph
+from cache import load_graph_cached
+from ch import CH_EXT, load_or_build
+from spatial import SpatialIndex
+from stats import SearchStats
+import alt
+
+# Cores das rotas alternativas além das duas primeiras (rota 3, 4, ...)
+EXTRA_COLORS = ['#2ca02c', '#9467bd', '#ff7f0e', '#17becf', '#e377c2', '#8c564b', '#bcbd22', '#7f7f7f']
+
+# Fração da tela desenhada além de cada borda, para que pequenos movimentos não exijam redesenho
+DRAW_MARGIN = 0.5
+
+# Tamanho (em pixels) do bloco em que no máximo um nó é desenhado
+NODE_PIXEL_CELL = 4
+
+# Acima desta quantidade de nós na região desenhada, apenas as ruas são desenhadas
+NODE_LOD_LIMIT = 3000
+
+# Intervalo (em ms) entre as verificações das tarefas da thread de trabalho
+POLL_MS = 50
 
 class Visualizer(tk.Tk):
     def __init__(self, graph: Graph):
@@ -17,6 +36,19 @@ class Visualizer(tk.Tk):
         self.end_id = None
         self.path1 = None
         self.path2 = None
+        self.map_path = None
+        self.spatial = None
+        self.drawn_region = (0, 0, 0, 0)  # Região da tela (com margem) coberta pela camada base
+        self._redraw_pending = None
+        self.extra_paths = []  # Rotas alternativas além das duas primeiras (k > 2)
+
+        # Thread de trabalho para carregamento e buscas; os resultados voltam à interface via after()
+        self.executor = ThreadPoolExecutor(max_workers=1)
+        self._query_future = None
+        self._query_generation = 0  # Incrementado a cada nova consulta; resultados antigos são descartados
+        self._load_progress = 0.0
+        self.search_stats = SearchStats()  # Estatísticas acumuladas das consultas instrumentadas
+        self.protocol("WM_DELETE_WINDOW", self._on_close)
 
         # Frame principal: divide entre área de desenho (canvas) e sidebar de controles
         main_frame = ttk.Frame(self)
@@ -36,6 +68,8 @@ class Visualizer(tk.Tk):
         status_header.pack(pady=(0, 5), anchor='w')
         self.status_label = ttk.Label(sidebar, text="Carregue um arquivo GeoJSON.", wraplength=280)
         self.status_label.pack(pady=5, anchor='w', fill=tk.X)
+        self.progress_bar = ttk.Progressbar(sidebar, mode='determinate', maximum=1.0)
+        self.progress_bar.pack(fill=tk.X, pady=(0, 5))
 
         # Exibição de informações do grafo (número de nós e arestas)
         self.graph_info_label = ttk.Label(sidebar, text="Informações do Grafo", font=("TkDefaultFont", 10, "bold"))
@@ -51,19 +85,40 @@ class Visualizer(tk.Tk):
 
         ttk.Separator(sidebar, orient='horizontal').pack(fill='x', pady=5)
 
-        # Escolha do algoritmo (Dijkstra ou A*)
+        # Escolha do algoritmo (variantes de Dijkstra ou A*)
         algo_header = ttk.Label(sidebar, text="Algoritmo", font=("TkDefaultFont", 10, "bold"))
         algo_header.pack(anchor='w')
         self.method_var = tk.StringVar(value='D')
         dijkstra_rb = ttk.Radiobutton(sidebar, text="Dijkstra (Otimizado)", variable=self.method_var, value='D')
         dijkstra_rb.pack(anchor='w')
+        dijkstra_pp_rb = ttk.Radiobutton(sidebar, text="Dijkstra Ponto a Ponto", variable=self.method_var, value='DP')
+        dijkstra_pp_rb.pack(anchor='w')
+        dijkstra_bd_rb = ttk.Radiobutton(sidebar, text="Dijkstra Bidirecional", variable=self.method_var, value='DB')
+        dijkstra_bd_rb.pack(anchor='w')
         astar_rb = ttk.Radiobutton(sidebar, text="A* (A-Star)", variable=self.method_var, value='A')
         astar_rb.pack(anchor='w')
+        ch_rb = ttk.Radiobutton(sidebar, text="Contraction Hierarchies", variable=self.method_var, value='CH')
+        ch_rb.pack(anchor='w')
+        alt_rb = ttk.Radiobutton(sidebar, text="A* com Landmarks (ALT)", variable=self.method_var, value='ALT')
+        alt_rb.pack(anchor='w')
+
+        # Quantidade de rotas: 2 mantém o modo original; acima disso usa os k menores caminhos (Yen)
+        k_frame = ttk.Frame(sidebar)
+        k_frame.pack(anchor='w', pady=(5, 0))
+        ttk.Label(k_frame, text="Número de rotas (k):").pack(side=tk.LEFT)
+        self.k_var = tk.IntVar(value=2)
+        ttk.Spinbox(k_frame, from_=2, to=10, width=4, textvariable=self.k_var).pack(side=tk.LEFT, padx=5)
 
         # Label para exibir o tempo de execução da busca
         self.time_label = ttk.Label(sidebar, text="Tempo de Execução: -", font=("TkDefaultFont", 9, "italic"))
         self.time_label.pack(pady=(5,0), anchor='w')
 
+        # Estatísticas da busca (nós fixados, operações na fila, tempo por fase), coletadas só quando marcado
+        self.stats_var = tk.BooleanVar(value=False)
+        ttk.Checkbutton(sidebar, text="Coletar estatísticas da busca", variable=self.stats_var).pack(anchor='w')
+        self.stats_label = ttk.Label(sidebar, text="", wraplength=280, justify=tk.LEFT, font=("TkDefaultFont", 8))
+        self.stats_label.pack(anchor='w', fill=tk.X)
+
         ttk.Separator(sidebar, orient='horizontal').pack(fill='x', pady=10)
 
         # Exibição dos detalhes do primeiro caminho encontrado
@@ -78,6 +133,12 @@ class Visualizer(tk.Tk):
         self.path2_details = ttk.Label(sidebar, text="-", wraplength=280, justify=tk.LEFT)
         self.path2_details.pack(pady=5, anchor='w', fill=tk.X)
 
+        # Exibição resumida das demais rotas (quando k > 2)
+        extra_header = ttk.Label(sidebar, text="Outras Rotas", font=("TkDefaultFont", 10, "bold"))
+        extra_header.pack(anchor='w', pady=(10, 0))
+        self.extra_details = ttk.Label(sidebar, text="-", wraplength=280, justify=tk.LEFT)
+        self.extra_details.pack(pady=5, anchor='w', fill=tk.X)
+
         # Variáveis de controle para zoom e movimentação no canvas
         self.margin, self.scale = 20, 1.0
         self.offset_x, self.offset_y = 0, 0
@@ -94,57 +155,45 @@ class Visualizer(tk.Tk):
 
     def _load_graph_from_file(self):
         """
-        Abre uma janela para o usuário selecionar o arquivo GeoJSON, 
-        lê os dados e popula o grafo com nós e arestas.
+        Abre uma janela para o usuário selecionar o arquivo GeoJSON
+        e carrega o grafo em segundo plano, reaproveitando o cache binário do arquivo
+        quando ele é válido. A barra de progresso acompanha a leitura do arquivo.
         """
         path = filedialog.askopenfilename(title="Selecione GeoJSON", filetypes=[("GeoJSON", "*.geojson *.json")])
         if not path:
             self.destroy()
             return
 
-        t0 = time.perf_counter() # Tempo inicial para medir performance
-        with open(path, 'r', encoding='utf-8') as f:
-            data = json.load(f)
-        
-        # Para cada feature no GeoJSON, extrai ruas e pontos
-        for feat in data['features']:
-            geometry = feat.get('geometry')
-            if not geometry:
-                continue
+        self.status_label.config(text="Carregando mapa...")
+        self._load_progress = 0.0
+        self.progress_bar['value'] = 0.0
 
-            street = feat['properties'].get('name', '')
-            geom_type = geometry.get('type')
-            coords = geometry.get('coordinates')
-            
-            # Lista que conterá os pontos a serem processados
-            points_to_process = []
-
-            # Trata tanto LineString quanto Polygon
-            if geom_type == 'LineString':
-                points_to_process = coords
-            elif geom_type == 'Polygon':
-                # Para polígonos, as coordenadas são uma lista de anéis.
-                # Usamos apenas o primeiro anel (o contorno externo).
-                if coords and len(coords) > 0:
-                    points_to_process = coords[0]
-            
-            # Se não for um tipo de geometria que sabemos tratar, pulamos para a próxima feature
-            if not points_to_process:
-                continue
+        def report(fraction):
+            # Chamado na thread de trabalho: apenas guarda o valor, lido pela interface em _poll
+            self._load_progress = fraction
+
+        def load():
+            t0 = time.perf_counter() # Tempo inicial para medir performance
+            graph = load_graph_cached(path, progress=report).to_graph()
+            spatial = SpatialIndex(graph)
+            return graph, spatial, (time.perf_counter() - t0) * 1000
+
+        def tick():
+            self.progress_bar['value'] = self._load_progress
+
+        self._submit(load, lambda result: self._on_graph_loaded(path, *result), tick)
+
+    def _on_graph_loaded(self, path, graph, spatial, load_time):
+        """
+        Conclui o carregamento na thread da interface: atualiza informações, limites e escala.
+        """
+        self.graph = graph
+        self.map_path = path
+        self.spatial = spatial
+        self.search_stats = SearchStats()
+        self.progress_bar['value'] = 1.0
 
-            # Agora o processamento é seguro, pois points_to_process é uma lista simples de pontos
-            for lon, lat in points_to_process:
-                self.graph.add_node(str((lon, lat)), lon, lat)
-            
-            # Cria arestas entre pontos consecutivos
-            for i in range(len(points_to_process) - 1):
-                u_lon, u_lat = points_to_process[i]
-                v_lon, v_lat = points_to_process[i+1]
-                w = haversine_distance(u_lat, u_lon, v_lat, v_lon)
-                self.graph.add_edge(str((u_lon, u_lat)), str((v_lon, v_lat)), w, street)
-        
         # Exibe tempo de carregamento e informações básicas
-        load_time = (time.perf_counter() - t0) * 1000
         self.status_label.config(text=f"Grafo processado em {load_time:.2f} ms.\nSelecione o ponto inicial.")
 
         num_nodes = len(self.graph.nodes)
@@ -167,61 +216,155 @@ class Visualizer(tk.Tk):
         self.scale = min(scale_x, scale_y)
         self._redraw()
 
+    def _submit(self, func, on_done, on_tick=None) -> Future:
+        """
+        Executa func na thread de trabalho e agenda on_done(resultado) na thread da interface.
+        on_tick, se informado, é chamado a cada verificação enquanto a tarefa não termina.
+        """
+        future = self.executor.submit(func)
+        self.after(POLL_MS, self._poll, future, on_done, on_tick)
+        return future
+
+    def _poll(self, future: Future, on_done, on_tick):
+        """
+        Verifica periodicamente (via after) se a tarefa terminou, sem bloquear a interface.
+        """
+        if future.cancelled():
+            return
+        if not future.done():
+            if on_tick:
+                on_tick()
+            self.after(POLL_MS, self._poll, future, on_done, on_tick)
+            return
+        error = future.exception()
+        if error is not None:
+            self.status_label.config(text=f"Erro: {error}")
+            return
+        on_done(future.result())
+
+    def _on_close(self):
+        """
+        Fecha a janela descartando tarefas pendentes da thread de trabalho.
+        """
+        self.executor.shutdown(wait=False, cancel_futures=True)
+        self.destroy()
+
     def _on_click(self, event):
         """
         Evento de clique do mouse: seleciona o nó mais próximo.
         Se for o primeiro clique, define como ponto de partida;
-        Se for o segundo, define como destino e executa busca pelo(s) melhor(es) caminho(s).
-        """
-        closest, min_d = None, math.inf
-        for nid, n in self.graph.nodes.items():
-            sx, sy = self.world_to_screen(n.x, n.y)
-            d = (sx - event.x)**2 + (sy - event.y)**2
-            if d < min_d:
-                min_d, closest = d, nid
-        
-        if not self.start_id:
-            # Primeiro clique: seleciona ponto inicial
+        Se for o segundo, define como destino e executa busca pelo(s) melhor(es) caminho(s)
+        em segundo plano. Um novo clique cancela a consulta anterior ainda não concluída.
+        """
+        if self.spatial is None:
+            return  # Mapa ainda em carregamento
+
+        # Converte o clique para coordenadas geográficas e consulta o índice espacial
+        lon, lat = self.screen_to_world(event.x, event.y)
+        closest = self.spatial.nearest_node(lat, lon)
+        if closest is None:
+            return
+
+        if self.start_id is None:
+            # Primeiro clique: seleciona ponto inicial e descarta a consulta em andamento, se houver
+            self._cancel_query()
             self.start_id = closest
             self.status_label.config(text="Ponto inicial selecionado.\nSelecione o ponto final.")
-            self._redraw()
+            self._draw_overlays()
         else:
             # Segundo clique: seleciona ponto final e executa algoritmo escolhido
             self.end_id = closest
             if messagebox.askyesno("Confirmar Rota", "Deseja encontrar o menor caminho?"):
-                
-                t_start = time.perf_counter()
-                selected_method = self.method_var.get()
-                p1, p2 = self.graph.shortest_two_paths(self.start_id, self.end_id, selected_method)
-                t_end = time.perf_counter()
-                
-                self.path1, self.path2 = p1, p2
-                exec_time_ms = (t_end - t_start) * 1000
-                self.time_label.config(text=f"Tempo de Execução: {exec_time_ms:.2f} ms")
-
-                # Função auxiliar para resumir distância e ruas do caminho
-                def summarize(path):
-                    if not path: return 0.0, ["N/A"]
-                    dist = sum(w for _, _, w, _ in path)
-                    ruas = list(dict.fromkeys([name for _, _, _, name in path if name]))
-                    return dist, ruas if ruas else ["Trecho desconhecido"]
-
-                d1, r1 = summarize(p1)
-                d2, r2 = summarize(p2)
-                
-                dist_km1, dist_km2 = d1 / 1000, d2 / 1000
-                
-                self.status_label.config(text="Caminhos calculados!")
-                self.path1_details.config(text=f"Distância: {dist_km1:.2f} km\nRuas: {', '.join(r1)}")
-                self.path2_details.config(text=f"Distância: {dist_km2:.2f} km\nRuas: {', '.join(r2)}")
-
-                self._redraw()
+                self._start_query(self.start_id, self.end_id, self.method_var.get(), self.k_var.get())
+                self.status_label.config(text="Calculando caminhos...")
+                self._draw_overlays()
                 self.start_id, self.end_id = None, None
             else:
                 # Se cancelar, volta para seleção do destino
                 self.end_id = None
                 self.status_label.config(text="Seleção do ponto final cancelada.")
-                self._redraw()
+                self._draw_overlays()
+
+    def _cancel_query(self):
+        """
+        Invalida a consulta em andamento: se ainda estiver na fila, é cancelada;
+        se já estiver executando, seu resultado é descartado ao terminar.
+        """
+        self._query_generation += 1
+        if self._query_future is not None:
+            self._query_future.cancel()
+            self._query_future = None
+
+    def _start_query(self, start_id, end_id, selected_method, k):
+        """
+        Envia a busca dos caminhos para a thread de trabalho.
+        """
+        self._cancel_query()
+        generation = self._query_generation
+        graph, map_path = self.graph, self.map_path
+        collect = self.stats_var.get()
+
+        def compute():
+            t_start = time.perf_counter()
+            if selected_method == 'CH' and graph.hierarchy is None:
+                # A hierarquia é construída uma vez por mapa e gravada ao lado do GeoJSON
+                graph.hierarchy = load_or_build(graph, map_path + CH_EXT)
+            elif selected_method == 'ALT' and graph.landmarks is None:
+                # As tabelas de landmarks também são calculadas uma vez por mapa
+                graph.landmarks = alt.load_or_build(graph, map_path + alt.ALT_EXT)
+            stats = None
+            if k <= 2 and collect:
+                p1, p2, stats = graph.shortest_two_paths_with_stats(start_id, end_id, selected_method)
+                extras = []
+            elif k <= 2:
+                p1, p2 = graph.shortest_two_paths(start_id, end_id, selected_method)
+                extras = []
+            else:
+                paths = graph.k_shortest_paths(start_id, end_id, k, selected_method)
+                paths += [[]] * (2 - len(paths))
+                p1, p2, extras = paths[0], paths[1], paths[2:]
+            return p1, p2, extras, (time.perf_counter() - t_start) * 1000, stats
+
+        def done(result):
+            if generation == self._query_generation:
+                self._query_future = None
+                self._show_paths(*result)
+
+        self._query_future = self._submit(compute, done)
+
+    def _show_paths(self, p1, p2, extras, exec_time_ms, stats=None):
+        """
+        Exibe os caminhos calculados (e as estatísticas da busca, se coletadas) na barra lateral e no mapa.
+        """
+        self.path1, self.path2 = p1, p2
+        self.extra_paths = extras
+        self.time_label.config(text=f"Tempo de Execução: {exec_time_ms:.2f} ms")
+        if stats is not None:
+            self.search_stats.add(stats)
+            self.stats_label.config(text=f"Última consulta:\n{stats.summary()}\n\n"
+                                         f"Acumulado: {self.search_stats.summary()}")
+        else:
+            self.stats_label.config(text="")
+
+        # Função auxiliar para resumir distância e ruas do caminho
+        def summarize(path):
+            if not path: return 0.0, ["N/A"]
+            dist = sum(w for _, _, w, _ in path)
+            ruas = list(dict.fromkeys([name for _, _, _, name in path if name]))
+            return dist, ruas if ruas else ["Trecho desconhecido"]
+
+        d1, r1 = summarize(p1)
+        d2, r2 = summarize(p2)
+
+        dist_km1, dist_km2 = d1 / 1000, d2 / 1000
+
+        self.status_label.config(text="Caminhos calculados!")
+        self.path1_details.config(text=f"Distância: {dist_km1:.2f} km\nRuas: {', '.join(r1)}")
+        self.path2_details.config(text=f"Distância: {dist_km2:.2f} km\nRuas: {', '.join(r2)}")
+        extra_lines = [f"Rota {i}: {summarize(p)[0] / 1000:.2f} km" for i, p in enumerate(extras, start=3)]
+        self.extra_details.config(text="\n".join(extra_lines) or "-")
+
+        self._draw_overlays()
 
     def world_to_screen(self, lon, lat):
         """
@@ -234,41 +377,104 @@ class Visualizer(tk.Tk):
         y = canvas_height - ((lat - self.min_y) * self.scale + self.margin) - self.offset_y
         return x, y
 
+    def screen_to_world(self, x, y):
+        """
+        Converte coordenadas de tela (canvas) para coordenadas geográficas (inversa de world_to_screen).
+        """
+        canvas_height = self.canvas.winfo_height() or 600
+        lon = (x - self.margin - self.offset_x) / self.scale + self.min_x
+        lat = (canvas_height - y - self.margin - self.offset_y) / self.scale + self.min_y
+        return lon, lat
+
     def _redraw(self):
         """
-        Redesenha todo o grafo no canvas, incluindo nós, arestas e os caminhos destacados.
+        Redesenha a camada base (ruas e nós) apenas na região visível, ampliada por uma margem,
+        e em seguida as sobreposições (caminhos e pontos selecionados).
+        As arestas e nós vêm do índice espacial; segmentos que caem no mesmo pixel e nós
+        que caem no mesmo bloco de pixels são desenhados uma única vez, e com muitos nós
+        na região apenas as ruas são desenhadas (nível de detalhe).
         """
+        self._redraw_pending = None
         self.canvas.delete('all')
-        
-        # Coleta os nós envolvidos nos caminhos para destacar
-        path1_nodes = {n.id for segment in (self.path1 or []) for n in (segment[0], segment[1])}
-        path2_nodes = {n.id for segment in (self.path2 or []) for n in (segment[0], segment[1])}
-        
-        # Desenha todas as arestas (ruas) em cinza claro
-        for u in self.graph.nodes.values():
+        if self.spatial is None:
+            return
+
+        width = self.canvas.winfo_width() or 800
+        height = self.canvas.winfo_height() or 600
+        mx, my = width * DRAW_MARGIN, height * DRAW_MARGIN
+        self.drawn_region = (-mx, -my, width + mx, height + my)
+
+        # Retângulo geográfico correspondente à região desenhada
+        lon0, lat0 = self.screen_to_world(-mx, height + my)
+        lon1, lat1 = self.screen_to_world(width + mx, -my)
+        # Limitado à extensão do mapa: com zoom afastado, a região além dela não tem nada a desenhar
+        lon0, lat0 = max(lon0, self.min_x), max(lat0, self.min_y)
+        lon1, lat1 = min(lon1, self.max_x), min(lat1, self.max_y)
+
+        # Desenha as arestas (ruas) em cinza claro, uma vez por aresta não direcionada
+        drawn_segments = set()
+        for u, v, _, _ in self.spatial.edges_within(lat0, lon0, lat1, lon1):
             x1, y1 = self.world_to_screen(u.x, u.y)
-            for v, _, _ in u.edges:
-                x2, y2 = self.world_to_screen(v.x, v.y)
-                self.canvas.create_line(x1, y1, x2, y2, fill='lightgray')
-
-        # Desenha os nós, destacando início, fim e caminhos
-        for u_id, u_node in self.graph.nodes.items():
-            x, y = self.world_to_screen(u_node.x, u_node.y)
-            radius, color = 3, 'black'
-
-            if u_id == self.start_id:
-                radius, color = 7, '#28a745'    # Verde: ponto inicial
-            elif u_id == self.end_id:
-                radius, color = 7, '#007bff'    # Azul: ponto final
-            elif u_id in path1_nodes or u_id in path2_nodes:
-                radius, color = 4, '#ffc107'    # Amarelo: nó do caminho
-
-            self.canvas.create_oval(x - radius, y - radius, x + radius, y + radius, fill=color, outline='white')
-        
-        # Desenha os caminhos encontrados: 1 (vermelho), 2 (azul)
+            x2, y2 = self.world_to_screen(v.x, v.y)
+            key = (round(x1), round(y1), round(x2), round(y2))
+            if key[:2] == key[2:] or key in drawn_segments:
+                continue
+            drawn_segments.add(key)
+            self.canvas.create_line(x1, y1, x2, y2, fill='lightgray', tags='base')
+
+        # Desenha os nós visíveis, no máximo um por bloco de NODE_PIXEL_CELL pixels;
+        # com zoom muito afastado (nós demais na região) eles são omitidos
+        visible_nodes = self.spatial.nodes_within(lat0, lon0, lat1, lon1)
+        if len(visible_nodes) > NODE_LOD_LIMIT:
+            visible_nodes = []
+        drawn_cells = set()
+        for nid in visible_nodes:
+            node = self.graph.nodes[nid]
+            x, y = self.world_to_screen(node.x, node.y)
+            cell = (int(x // NODE_PIXEL_CELL), int(y // NODE_PIXEL_CELL))
+            if cell in drawn_cells:
+                continue
+            drawn_cells.add(cell)
+            self.canvas.create_oval(x - 3, y - 3, x + 3, y + 3, fill='black', outline='white', tags='base')
+
+        self._draw_overlays()
+
+    def _draw_overlays(self):
+        """
+        Redesenha apenas as sobreposições: nós dos caminhos, pontos de início/fim e os caminhos.
+        Usado quando a rota muda, sem recriar a camada base.
+        """
+        self.canvas.delete('overlay')
+
+        # Destaca os nós envolvidos nos caminhos em amarelo
+        path_nodes = {}
+        for path in [self.path1 or [], self.path2 or []] + self.extra_paths:
+            for segment in path:
+                for n in (segment[0], segment[1]):
+                    path_nodes[n.id] = n
+        for nid, node in path_nodes.items():
+            if nid not in (self.start_id, self.end_id):
+                self._draw_marker(node, 4, '#ffc107')
+
+        # Verde: ponto inicial; azul: ponto final
+        if self.start_id is not None:
+            self._draw_marker(self.graph.nodes[self.start_id], 7, '#28a745')
+        if self.end_id is not None:
+            self._draw_marker(self.graph.nodes[self.end_id], 7, '#007bff')
+
+        # Desenha os caminhos encontrados: demais rotas por baixo, 1 (vermelho) e 2 (azul) por cima
+        for i, path in enumerate(self.extra_paths):
+            self._draw_path(path, EXTRA_COLORS[i % len(EXTRA_COLORS)])
         if self.path1: self._draw_path(self.path1, 'red')
         if self.path2: self._draw_path(self.path2, 'blue')
-        
+
+    def _draw_marker(self, node, radius, color):
+        """
+        Desenha um nó destacado (camada de sobreposição).
+        """
+        x, y = self.world_to_screen(node.x, node.y)
+        self.canvas.create_oval(x - radius, y - radius, x + radius, y + radius, fill=color, outline='white', tags='overlay')
+
     def _draw_path(self, path, color):
         """
         Desenha um caminho destacado no canvas, na cor especificada.
@@ -276,19 +482,31 @@ class Visualizer(tk.Tk):
         for u, v, _, _ in path:
             x1, y1 = self.world_to_screen(u.x, u.y)
             x2, y2 = self.world_to_screen(v.x, v.y)
-            self.canvas.create_line(x1, y1, x2, y2, width=3, fill=color)
+            self.canvas.create_line(x1, y1, x2, y2, width=3, fill=color, tags='overlay')
+
+    def _schedule_redraw(self):
+        """
+        Agenda um redesenho para quando a interface estiver ociosa, juntando vários eventos
+        seguidos (por exemplo, ticks da roda do mouse) em um único redesenho.
+        """
+        if self._redraw_pending is None:
+            self._redraw_pending = self.after_idle(self._redraw)
 
     def _reset_selection(self):
         """
         Reseta seleção dos pontos de início/fim e dos caminhos exibidos.
         """
+        self._cancel_query()
         self.start_id, self.end_id = None, None
         self.path1, self.path2 = None, None
+        self.extra_paths = []
         self.status_label.config(text="Seleção resetada. Escolha um ponto de início.")
         self.path1_details.config(text="-")
         self.path2_details.config(text="-")
+        self.extra_details.config(text="-")
         self.time_label.config(text="Tempo de Execução: -")
-        self._redraw()
+        self.stats_label.config(text="")
+        self._draw_overlays()
 
     def _on_pan_start(self, event):
         """
@@ -306,7 +524,15 @@ class Visualizer(tk.Tk):
             self.offset_x += dx
             self.offset_y += dy
             self._pan_start = (event.x, event.y)
-            self._redraw()
+
+            # Move os itens já desenhados; só redesenha se a área visível sair da região desenhada
+            self.canvas.move('all', dx, -dy)
+            x0, y0, x1, y1 = self.drawn_region
+            self.drawn_region = (x0 + dx, y0 - dy, x1 + dx, y1 - dy)
+            width = self.canvas.winfo_width() or 800
+            height = self.canvas.winfo_height() or 600
+            if x0 + dx > 0 or y0 - dy > 0 or x1 + dx < width or y1 - dy < height:
+                self._schedule_redraw()
 
     def _on_zoom(self, event):
         """
@@ -319,4 +545,4 @@ class Visualizer(tk.Tk):
         cx, cy = event.x, event.y
         self.offset_x = cx - (cx - self.offset_x) * (self.scale / old_scale)
         self.offset_y = cy - (cy - self.offset_y) * (self.scale / old_scale)
-        self._redraw()
\ No newline at end of file
+        self._schedule_redraw()
\ No newline at end of file